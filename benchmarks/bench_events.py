@@ -0,0 +1,65 @@
+'''Event bus dispatch benchmark: cost of a change as the number of subscriptions grows.
+
+Builds a model of a rack of channels, subscribes one handler to each channel (as a
+client showing a single channel would), and times changing one voltage, which only
+needs to reach one handler. Also times publishing to the bus directly, and the same
+change with a single handler subscribed to everything.
+
+    python benchmarks/bench_events.py
+'''
+import timeit
+
+from slapdash import Model
+
+
+class Channel:
+    def __init__(self):
+        self.voltage = 0.0
+        self.enabled = False
+
+
+class Rack:
+    def __init__(self, n_channels):
+        self.channels = [Channel() for _ in range(n_channels)]
+
+
+def handler(message):
+    pass
+
+
+def measure(n_channels, number=100000):
+    rack = Rack(n_channels)
+    model = Model(rack)
+    for i in range(n_channels):
+        model.events.subscribe(handler, prefix=f'channels[{i}]')
+    channel = rack.channels[n_channels // 2]
+    message = {'name': f'channels.{n_channels // 2}.voltage', 'value': 1.0}
+
+    def change():
+        channel.voltage = 1.0
+
+    set_time = timeit.timeit(change, number=number) / number
+    publish_time = timeit.timeit(lambda: model.events.publish(message), number=number) / number
+    return set_time, publish_time
+
+
+def measure_unsubscribed(number=100000):
+    rack = Rack(1)
+    model = Model(rack)
+    channel = rack.channels[0]
+
+    def change():
+        channel.voltage = 1.0
+
+    idle_time = timeit.timeit(change, number=number) / number
+    model.events.subscribe(handler)
+    return idle_time, timeit.timeit(change, number=number) / number
+
+
+if __name__ == '__main__':
+    idle_time, all_time = measure_unsubscribed()
+    print(f'no subscribers:      set {idle_time * 1e6:6.2f} us')
+    print(f'one subscriber, all: set {all_time * 1e6:6.2f} us')
+    for n_channels in (10, 100, 1000, 10000):
+        set_time, publish_time = measure(n_channels)
+        print(f'{n_channels:5d} subscriptions:  set {set_time * 1e6:6.2f} us, publish {publish_time * 1e6:6.2f} us')
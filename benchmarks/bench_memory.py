@@ -0,0 +1,60 @@
+'''Memory regression benchmark: bytes allocated per prop by the data model.
+
+Builds the data model of an interface with about 10k props (1000 channels with
+10 attributes each) and reports the memory allocated by `Model` per prop,
+excluding the interface itself.
+
+    python benchmarks/bench_memory.py
+'''
+import gc
+import tracemalloc
+from enum import Enum
+
+from slapdash import Model
+
+
+N_CHANNELS = 1000
+
+
+class Coupling(Enum):
+    DC = 'DC'
+    AC = 'AC'
+
+
+class Channel:
+    def __init__(self, index):
+        self.voltage = 0.1 * index
+        self.current = 0.0
+        self.offset = 0.0
+        self.gain = 1
+        self.phase = 0.0
+        self.enabled = False
+        self.label = f'channel {index}'
+        self.coupling = Coupling.DC
+        self.limits = [0.0, 10.0]
+
+    def reset(self):
+        self.voltage = 0.0
+
+
+class Device:
+    def __init__(self):
+        self.channels = [Channel(index) for index in range(N_CHANNELS)]
+
+
+def measure():
+    device = Device()
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    model = Model(device)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    n_props = len(model.flat_props())
+    return n_props, size
+
+
+if __name__ == '__main__':
+    n_props, size = measure()
+    print(f'{n_props} props, {size / 1e6:.2f} MB, {size / n_props:.0f} bytes per prop')
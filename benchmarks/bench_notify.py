@@ -0,0 +1,80 @@
+'''Notification throughput benchmark: updates published from background threads.
+
+Publishes updates from several threads to a `Notifier` whose consumer runs on
+an asyncio loop, first as fast as possible, then paced at 10k updates/s, and
+reports the publishing cost, the delivery rate and the delivery latency.
+
+    python benchmarks/bench_notify.py
+'''
+import asyncio
+import threading
+import time
+
+from slapdash.notifier import Notifier
+
+
+N_THREADS = 4
+
+
+def measure(n_updates, rate=None):
+    loop = asyncio.new_event_loop()
+    latencies = []
+    done = threading.Event()
+
+    async def deliver(message):
+        latencies.append(time.perf_counter() - message['value'])
+        if len(latencies) == n_updates:
+            done.set()
+
+    notifier = Notifier(deliver)
+    notifier.start(loop)
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    publish_times = []
+
+    def publisher(index):
+        n = n_updates // N_THREADS
+        interval = N_THREADS / rate if rate else 0
+        start = time.perf_counter()
+        publish_time = 0
+        for i in range(n):
+            if interval:
+                while time.perf_counter() < start + i * interval:
+                    time.sleep(0)
+            now = time.perf_counter()
+            notifier.publish({'name': f'channels.{index}.voltage', 'value': now})
+            publish_time += time.perf_counter() - now
+        publish_times.append((publish_time, n))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=publisher, args=(index,)) for index in range(N_THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    done.wait(30)
+    elapsed = time.perf_counter() - start
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    for task in asyncio.all_tasks(loop):
+        task.cancel()
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
+
+    latencies.sort()
+    return {
+        'delivered/s': len(latencies) / elapsed,
+        'publish us': 1e6 * sum(t for t, n in publish_times) / sum(n for t, n in publish_times),
+        'median latency ms': 1e3 * latencies[len(latencies) // 2],
+        'p99 latency ms': 1e3 * latencies[int(len(latencies) * 0.99)],
+    }
+
+
+def report(title, results):
+    print(title + ': ' + ', '.join(f'{key} {value:.3g}' for key, value in results.items()))
+
+
+if __name__ == '__main__':
+    report(f'100k updates from {N_THREADS} threads, unpaced', measure(100000))
+    report(f'20k updates from {N_THREADS} threads at 10k/s', measure(20000, rate=10000))
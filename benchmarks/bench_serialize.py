@@ -0,0 +1,32 @@
+'''Serialization benchmark: per-element cost of serializing base type lists.
+
+Serializes flat lists of ints and floats, and a nested list of floats,
+with 10^3 to 10^6 elements through the data model.
+
+    python benchmarks/bench_serialize.py
+'''
+import timeit
+
+from slapdash import Model
+
+
+class Lists:
+    def __init__(self, n):
+        self.ints = list(range(n))
+        self.floats = [0.5 * i for i in range(n)]
+        self.nested = [[0.5 * i] * 100 for i in range(n // 100)]
+
+
+def measure(n, name):
+    model = Model(Lists(n))
+    node = model[name]
+    number = max(1, 10**5 // n)
+    seconds = min(timeit.repeat(node.serialize, number=number, repeat=3)) / number
+    return seconds / n
+
+
+if __name__ == '__main__':
+    for exponent in range(3, 7):
+        n = 10**exponent
+        costs = ', '.join(f'{name} {measure(n, name) * 1e9:.1f} ns' for name in ('ints', 'floats', 'nested'))
+        print(f'10^{exponent} elements: {costs} per element')
@@ -1,6 +1,6 @@
 from .version import __version__
 
 from .main import run
-from .model import Model
+from .model import Model, batch
 from .client import Client
 from .decorators import refresh, metadata, trigger_update, Saver, create_dashboard_task, run_dashboard_coroutine_threadsafe
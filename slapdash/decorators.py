@@ -6,17 +6,39 @@ import logging
 import functools
 import inspect
 from enum import Enum
-from .model import BASE_TYPES
+from .model import BASE_TYPES, _notify_change, _listening, _defer_to_batch
+from .scheduler import RefreshEntry, get_scheduler, check_executor
 
 logger = logging.getLogger(__name__)
 
-def refresh(attr: str, delay: int = 1, delay_attr: str = None):
+def refresh(attr: str, delay: int = 1, delay_attr: str = None, executor=None,
+            min_delay: float = None, max_delay: float = None, version_attr: str = None):
     '''
     Decorate an attribute with `@refresh` to constantly update it in the GUI
     by having update notifications emitted at a regular interval (an interval
     that can be sourced by another attribute, `delay_attr`, if desired.)
     `attr` and `delay_attr` can be dot-separated to represent parameters
     in subclasses, like `subclass.parameter`.
+
+    Reading `attr` blocks the server's loop, unless `executor` is `'thread'`, to read it
+    in a thread pool (the loop's default executor), `'device'`, to read all `@refresh`
+    attributes of the same interface one at a time in a thread of its own, or a
+    `concurrent.futures.Executor`. The `refreshExecutor` metadata of `attr` is used
+    if `executor` is None.
+
+    If `min_delay` and `max_delay` are given instead of `delay` and `delay_attr`, the
+    interval adapts to how often `attr` changes: it is `min_delay` while `attr` changes,
+    and doubles after each unchanged read, up to `max_delay`. The current interval of each
+    attribute is available at the `/refresh_stats` endpoint.
+
+    `attr` is notified when a hash of its contents changes, and only serialized then. For
+    large values, e.g. graphs or images, `version_attr` can name a counter (like `delay_attr`)
+    that changes whenever `attr` does, so that `attr` is only read when it changed. The
+    `versionAttr` metadata of `attr`, the name of an attribute next to it, is used if
+    `version_attr` is None.
+
+    The attributes of all interfaces with the same interval are read together,
+    see `slapdash.scheduler.RefreshScheduler`.
     '''
     def resolve_itemattr(obj, attr):
         '''Generalize attrgetter to accept items as well, so as to resolve
@@ -40,40 +62,23 @@ def refresh(attr: str, delay: int = 1, delay_attr: str = None):
             return resolve_itemattr(obj, attr)
         return g
 
+    check_executor(executor)
+    if (min_delay is None) != (max_delay is None):
+        raise ValueError('An adaptive `@refresh` interval needs both `min_delay` and `max_delay`')
+    if min_delay is not None and (delay_attr is not None or not 0 < min_delay <= max_delay):
+        raise ValueError('`@refresh` needs 0 < `min_delay` <= `max_delay`, and no `delay_attr`, to adapt its interval')
+
     def decorator(cls):
         class Wrapped(cls):
             def __init__(self, *args, **kwargs):
                 super().__init__(*args, **kwargs)
 
-                async def start_counter():
-                    _delay = delay
-                    try:
-                        delay_getter = itemattrgetter(delay_attr)
-                    except (TypeError, AttributeError):
-                        delay_getter = None
-                    prev = None
-                    while True:
-                        if hasattr(self, '__data_model__'):
-                            model = self.__data_model__
-                            parent_name = model.parent_name
-
-                            value = model[attr]
-                            if hasattr(value, 'serialize'):
-                                value = value.serialize()
-                            if value != prev and prev is not None:
-                                self.__data_model__.emit(
-                                    {'name': parent_name + attr, 'value': value})
-                            prev = value
-
-                            try:
-                                # _delay = self.__getattribute__(delay_attr)
-                                _delay = delay_getter(self)
-                            except (TypeError, AttributeError):
-                                pass
-                        await asyncio.sleep(_delay)
-
+                # read by the loop's scheduler, along with all attributes of the same interval
+                entry = RefreshEntry(self, attr, delay, itemattrgetter(delay_attr) if delay_attr else None,
+                                     executor, min_delay, max_delay,
+                                     itemattrgetter(version_attr) if version_attr else None)
                 loop = asyncio.get_event_loop()
-                loop.call_soon(lambda: create_dashboard_task(start_counter(), loop))
+                loop.call_soon(get_scheduler(loop).add, entry)
         Wrapped.__name__ = cls.__name__
         return Wrapped
     return decorator
@@ -123,18 +128,21 @@ def trigger_update(target_attr: str):
 
         def emit_target_update(interface):
             '''Emits a message with the status of a secondary target.'''
+            if not hasattr(interface, '__data_model__') or not _listening(interface.__data_model__):
+                return
             if '_save_setting' not in [s.function for s in inspect.stack()]:
                 if hasattr(interface, '__data_model__'):
                     source_model = interface.__data_model__
-                    parent_name = source_model.parent_name
 
                     if not target_attr.startswith('_') and hasattr(interface, '__data_model__'):
-                        try:
+                        def serialize():
                             target_value = source_model[target_attr]
                             if hasattr(target_value, 'serialize'):
                                 target_value = target_value.serialize()
-                            interface.__data_model__.emit(
-                                {'name': parent_name + target_attr, 'value': target_value})
+                            return target_value
+
+                        try: # the target is only read if someone listens to the update
+                            _notify_change(source_model, target_attr, serialize)
                         except KeyError:  # source_model is {} if decorating a getter and before `emit` has been attached
                             try:
                                 logger.info(f"""Was not able to emit a linked update in `{fn.__name__}` with `trigger_update`
@@ -311,6 +319,11 @@ class Saver:
                             return next_object  # this is our desired value
                 nested_set(self._settings, setting_name,
                            walk_get(self, setting_name))
+                # write once at the end of a `batch` of changes
+                if not _defer_to_batch(self._write_settings):
+                    self._write_settings()
+
+            def _write_settings(self):
                 with open(self._settings_path, 'w') as f:
                     json.dump(self._settings, f, indent=4)
 
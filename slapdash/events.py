@@ -0,0 +1,144 @@
+'''
+Publish/subscribe of the notifications of a data model
+'''
+import asyncio
+import inspect
+import logging
+
+from .model import parse_path
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Node:
+    __slots__ = ('children', 'handlers')
+
+    def __init__(self):
+        self.children = {}
+        # (handler, values) pairs, replaced rather than modified so that
+        # publishing from other threads can iterate them safely
+        self.handlers = ()
+
+
+class EventBus:
+    '''Dispatches the notifications of a data model to handlers subscribed to path prefixes.
+
+    Subscriptions are kept in a trie of path keys, so publishing a notification only
+    visits the handlers of the prefixes of its name, independent of the number of other
+    subscriptions. A prefix such as `channels[2]` (or `channels.2`) receives the
+    notifications of `channels.2` and everything below it, the empty prefix receives
+    all notifications, and an empty index such as `channels[].voltage` matches any index.
+    A change of a name containing a prefix, e.g. of `channels` when a new list is assigned,
+    is delivered to the subscribers of the prefix as well, once to each handler.
+
+    Handlers are called with the notification, a dict with a 'name' and a 'value'.
+    Handlers subscribed with `values=False` only need the name of a change, and also
+    receive notifications without a value, which the model sends if no one needs values.
+    Coroutine functions are run on the event loop given, or else running when subscribing,
+    or else the current loop of the subscribing thread, e.g. the loop `run()` is about to run.
+    '''
+
+    def __init__(self):
+        self._root = _Node()
+        self._count = 0
+        # callbacks called with the prefix of each new subscription, from the subscribing thread
+        self._on_subscribe = []
+
+    def __bool__(self):
+        return self._count > 0
+
+    def subscribe(self, handler, prefix: str = '', values: bool = True, loop: asyncio.AbstractEventLoop = None):
+        if inspect.iscoroutinefunction(handler):
+            if loop is None:
+                try:
+                    loop = asyncio.get_running_loop()
+                except RuntimeError: # e.g. the add-in servers of `run()`, created before its loop runs
+                    loop = asyncio.get_event_loop()
+            handler = self._async_handler(handler, loop)
+        node = self._root
+        for key in parse_path(prefix):
+            node = node.children.setdefault(key, _Node())
+        node.handlers = node.handlers + ((handler, values),)
+        self._count += 1
+        for callback in self._on_subscribe:
+            callback(prefix)
+        return handler
+
+    def unsubscribe(self, handler, prefix: str = ''):
+        '''Remove a subscription, using the handler returned by `subscribe`'''
+        node = self._root
+        for key in parse_path(prefix):
+            node = node.children[key]
+        for entry in node.handlers:
+            if entry[0] == handler:
+                node.handlers = tuple(item for item in node.handlers if item is not entry)
+                self._count -= 1
+                return
+        raise KeyError(f'{handler} is not subscribed to `{prefix}`')
+
+    def wants(self, name: str):
+        '''None if no one subscribes to `name`, True if someone needs its value,
+        and False if its name is enough'''
+        if not self._count:
+            return None
+        wanted = None
+        for handler, values in self._handlers(name):
+            if values:
+                return True
+            wanted = False
+        return wanted
+
+    def subscribers(self, name: str) -> set:
+        '''The handlers subscribed to `name`'''
+        return {handler for handler, values in self._handlers(name)}
+
+    def publish(self, message):
+        values = 'value' in message
+        for handler, needs_value in self._handlers(message['name']):
+            if values or not needs_value:
+                try:
+                    handler(message)
+                except Exception:
+                    logger.exception(f'Notification handler {handler} failed for {message}')
+
+    def _handlers(self, name: str):
+        nodes = [self._root]
+        yielded = [self._root.handlers]
+        yield from self._root.handlers
+        for key in parse_path(name):
+            matches = []
+            for node in nodes:
+                for child in (node.children.get(key), node.children.get(None)):
+                    if child is not None:
+                        matches.append(child)
+                        yielded.append(child.handlers)
+                        yield from child.handlers
+            if not matches:
+                return
+            nodes = matches
+        # the subscribers below the name, whose values change along with it
+        below = [child for node in nodes for child in node.children.values()]
+        if not below:
+            return
+        seen = {handler for handlers in yielded for handler, values in handlers}
+        while below:
+            node = below.pop()
+            for entry in node.handlers:
+                if entry[0] not in seen:
+                    seen.add(entry[0])
+                    yield entry
+            below.extend(node.children.values())
+
+    @staticmethod
+    def _async_handler(handler, loop):
+        def schedule(message):
+            future = asyncio.run_coroutine_threadsafe(handler(message), loop)
+            future.add_done_callback(_log_exception)
+        schedule.__wrapped__ = handler
+        return schedule
+
+
+def _log_exception(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error('Notification handler failed', exc_info=future.exception())
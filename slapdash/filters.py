@@ -0,0 +1,216 @@
+'''
+Filters applied to the notifications of a data model before they are delivered
+'''
+import hashlib
+import heapq
+import itertools
+import logging
+import threading
+import time
+from array import array
+from collections import UserList
+from enum import Enum
+
+from .types import ARRAY_TYPES
+
+
+logger = logging.getLogger(__name__)
+
+_NUMBERS = (int, float) # bools are compared for equality only
+_SCALARS = frozenset((int, float, bool, str, type(None)))
+_SEQUENCES = (list, tuple, UserList)
+
+
+class _Timer:
+    '''A single daemon thread calling the functions scheduled with `call_later`,
+    in the order of their deadlines'''
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._heap = [] # (deadline, sequence number, function, args)
+        self._sequence = itertools.count()
+        self._thread = None
+
+    def call_later(self, delay: float, function, *args):
+        deadline = time.monotonic() + delay
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive(): # e.g. in a forked process
+                thread = threading.Thread(target=self._run, name='slapdash-timer', daemon=True)
+                thread.start() # raises before anything is scheduled if it cannot
+                self._thread = thread
+            heapq.heappush(self._heap, (deadline, next(self._sequence), function, args))
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                _, _, function, args = heapq.heappop(self._heap)
+            try:
+                function(*args)
+            except Exception:
+                logger.exception(f'Failed to call {function} later')
+
+
+_timer = _Timer()
+
+
+class Throttle:
+    '''Limits the notifications of a property to `max_rate` per second and name,
+    always delivering the last notification held back (trailing edge).
+
+    The last notification is delivered by a timer thread shared by all throttles, so that
+    it does not depend on the loop of the emitting thread, which may stop before.
+    '''
+
+    def __init__(self, max_rate: float, deliver):
+        self._interval = 1 / max_rate
+        self._deliver = deliver
+        self._lock = threading.Lock()
+        self._last = {} # name -> time of the last delivery
+        self._pending = {} # name -> last notification held back
+
+    def __call__(self, message):
+        name = message['name']
+        now = time.monotonic()
+        with self._lock:
+            if name in self._pending: # a delivery is already scheduled
+                self._pending[name] = message
+                return
+            delay = self._last.get(name, now - self._interval) + self._interval - now
+            if delay <= 0:
+                self._last[name] = now
+            else:
+                self._pending[name] = message
+        if delay <= 0:
+            self._deliver(message)
+            return
+        try:
+            _timer.call_later(delay, self._flush, name)
+        except RuntimeError: # no thread can be started, e.g. at interpreter shutdown
+            self._flush(name)
+
+    def _flush(self, name: str):
+        with self._lock:
+            message = self._pending.pop(name)
+            self._last[name] = time.monotonic()
+        self._deliver(message)
+
+
+class Deadband:
+    '''Drops the notifications of a numeric property whose value changed by less than
+    `deadband` since the last notification passed for the same name, either in absolute
+    terms or relative to the last value. Lists (and arrays) are compared element-wise,
+    passing if any element changed significantly.
+    '''
+
+    def __init__(self, deadband: float, relative: bool = False):
+        self._deadband = deadband
+        self._relative = relative
+        self._lock = threading.Lock()
+        self._last = {} # name -> value of the last notification passed
+
+    def __call__(self, message) -> bool:
+        '''Whether to pass `message` on'''
+        name = message['name']
+        value = message['value']
+        with self._lock:
+            if name in self._last and not self._significant(value, self._last[name]):
+                return False
+            self._last[name] = value
+        return True
+
+    def _significant(self, value, last) -> bool:
+        if isinstance(value, list) and isinstance(last, list):
+            return len(value) != len(last) or any(map(self._significant, value, last))
+        if type(value) in _NUMBERS and type(last) in _NUMBERS:
+            threshold = self._deadband * abs(last) if self._relative else self._deadband
+            change = abs(value - last)
+            return change > 0 and change >= threshold
+        return value != last
+
+
+def fingerprint(value):
+    '''A cheap, hashable stand-in for comparing `value` with an earlier value, or None if
+    it cannot be compared (e.g. an object). Lists and arrays are reduced to a digest of their
+    contents, and the types of their items, rather than kept element by element.'''
+    kind = type(value)
+    if kind in _SCALARS:
+        return kind, value
+    if isinstance(value, Enum):
+        return value
+    if isinstance(value, ARRAY_TYPES):
+        return value.dtype.str, value.shape, _digest(value.tobytes())
+    if isinstance(value, _SEQUENCES):
+        item_types = set(map(type, value))
+        if item_types <= _SCALARS:
+            return kind, len(value), _digest(_pack(value, item_types))
+        items = tuple(map(fingerprint, value)) # nested lists
+        if None in items:
+            return None
+        return kind, len(value), _digest(repr(items).encode())
+    return None
+
+
+def _pack(items, item_types: set) -> bytes:
+    '''The bytes of a sequence of scalars, distinguishing e.g. 1, 1.0 and True'''
+    if item_types == {float}:
+        return b'f' + array('d', items).tobytes()
+    if item_types == {int}:
+        try:
+            return b'i' + array('q', items).tobytes()
+        except OverflowError:
+            pass
+    return b'r' + repr(tuple(items)).encode()
+
+
+def _digest(data: bytes) -> bytes:
+    # unlike `hash`, practically free of collisions (e.g. `hash(-1) == hash(-2)`)
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class Unchanged:
+    '''Remembers the fingerprints of the values last notified, to drop the notifications
+    of assignments that did not change a value.
+
+    Fingerprints are kept in a trie of path keys, so that a change of a name can drop the
+    fingerprints of its items (e.g. `wave.3` when `wave` is reassigned) and of the names
+    containing it (e.g. `wave` when `wave.3` changes).
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._root = [None, {}] # [fingerprint, children by key]
+
+    def __bool__(self):
+        return bool(self._root[1])
+
+    def unchanged(self, keys: tuple, fingerprint) -> bool:
+        '''Whether `fingerprint` is the one last notified for `keys`'''
+        if fingerprint is None:
+            return False
+        node = self._root
+        for key in keys:
+            node = node[1].get(key)
+            if node is None:
+                return False
+        return node[0] == fingerprint
+
+    def remember(self, keys: tuple, fingerprint=None):
+        '''Record the fingerprint notified for `keys`, forgetting those of its items
+        and of the names containing it'''
+        with self._lock:
+            node = self._root
+            for key in keys:
+                node[0] = None
+                node = node[1].setdefault(key, [None, {}])
+            node[0] = fingerprint
+            node[1] = {}
+
+    def clear(self):
+        with self._lock:
+            self._root = [None, {}]
@@ -14,6 +14,9 @@ def run(interface,
         servers: list=[],
         loop=None,
         web_settings: dict={},
+        lazy_model: bool=False,
+        static_types: bool=False,
+        suppress_unchanged: bool=False,
         *args, **kwargs
         ):
     """
@@ -38,13 +41,30 @@ def run(interface,
         where `info` will include the data model name, slapdash version, web port, and any supplied
         `web_settings`.
         They should return a server instance with the method `serve()` that mirrors that of
-        `uvicorn.Server`.
+        `uvicorn.Server`. To receive the changes of the data model, they can subscribe a function
+        or coroutine function to `data_model.events`, e.g.
+        `data_model.events.subscribe(handler, prefix='channels')`.
         The default is [].
     loop : asyncio event loop or None, optional
         Specify an event loop to use to run all servers, in case you would prefer that the dashboard
         not create its own. The default is None, in which case the current event loop is used.
     web_settings : dict, optional
         DESCRIPTION. The default is {}.
+    lazy_model : bool, optional
+        Only explore the top level of `interface` on startup, and explore each sub-object
+        (and create its REST endpoints) when it is first accessed, e.g. through `get_props`,
+        `get_param`, a REST endpoint, or when the web frontend requests the full schema.
+        This speeds up the startup of servers for very large interfaces. The default is False.
+    static_types : bool, optional
+        Do not read properties (and other descriptors) whose getters are annotated with a base
+        type or an Enum class, e.g. `def voltage(self) -> float`, to build the data model.
+        Use this if reading a property is expensive, e.g. a hardware read. All other attributes
+        are read once. The default is False.
+    suppress_unchanged : bool, optional
+        Do not notify assignments of a value equal to the value last notified, e.g. when a driver
+        reassigns its full state after each poll of the hardware. Lists and arrays are compared by a
+        hash of their contents. Use the `suppressUnchanged` metadata to override this per property.
+        The default is False.
     *args : TYPE
         DESCRIPTION.
     **kwargs : TYPE
@@ -63,6 +83,12 @@ def run(interface,
     web_notify_callback : str or None, optional
         The name of a callback function in `interface` that will be called when notifications are
         triggered via the web interface.
+    client_queue_size : int, optional
+        The maximum number of changes queued for a web client that cannot keep up, e.g. on a slow
+        connection. The default is 1000.
+    client_queue_policy : str, optional
+        Which changes to drop once the queue of a web client is full: 'drop-oldest', or 'coalesce'
+        to keep only the last change of each property. The default is 'drop-oldest'.
     web_settings : dict, optional
         Any settings you would like to make available at the `/info` endpoint of the REST API.
 
@@ -71,7 +97,8 @@ def run(interface,
     None.
 
     """
-    data_model = Model(interface)
+    data_model = Model(interface, lazy=lazy_model, static_types=static_types,
+                       suppress_unchanged=suppress_unchanged)
     info = {
         'name': data_model.name,
         'version': __version__,
@@ -90,12 +117,9 @@ def run(interface,
 
     # if wrapped with @Saver, attach DashboardSavingInterface's saving callback to all model changes
     if 'DashboardSavingInterface' in [c.__name__ for c in type(data_model._interface).__mro__]:
-        data_model_emit = data_model.emit
-
-        def emit(message):
-            data_model_emit(message)
-            data_model._interface._trigger_save(message)
-        data_model.emit = emit
+        # the saver only needs the names of the changes of its settings
+        for name in data_model._interface._settings:
+            data_model.events.subscribe(data_model._interface._trigger_save, prefix=name, values=False)
 
     addin_servers = []
     try: # accept single server factor or list thereof
@@ -128,6 +152,7 @@ def run(interface,
     info['addin_servers'] = addin_server_info
     if enable_web:
         wapi = web_api(data_model=data_model, info=info, *args, **kwargs)
+        wapi._notifier.start(loop)
         web_server = uvicorn.Server(uvicorn.Config(wapi, host=host, port=port))
         # overwrite uvicorn's signal handlers, otherwise it will bogart SIGINT and
         # SIGTERM, which makes it impossible to escape out of
@@ -1,4 +1,4 @@
-from .types import BASE_TYPES
+from .types import BASE_TYPES, ARRAY_TYPES
 import inspect
 import logging
 logger = logging.getLogger(__name__)
@@ -24,17 +24,17 @@ METADATA_SPECS = {
     },
     'units': {
         'type': ['str', 'list', 'tuple'],
-        'prop_type': ['int', 'float', 'str', 'list', 'ModelList', 'UserList', 'tuple', 'group'],
+        'prop_type': ['int', 'float', 'str', 'list', 'ModelList', 'UserList', 'tuple', 'group', 'ndarray'],
         'description': "Meta text displayed in the input/text box"
     },
     'doc': {
         'type': ['str'],
-        'prop_type': ['method', 'bool', 'int', 'float', 'str', 'list', 'ModelList', 'UserList', 'group'],
+        'prop_type': ['method', 'bool', 'int', 'float', 'str', 'list', 'ModelList', 'UserList', 'group', 'ndarray'],
         'description': "An attribute docstring that may appear as a tooltip"
     },
     'renderAs': {
         'type': ['str'],
-        'prop_type': ['str', 'int', 'float', 'method', 'tuple', 'list'],
+        'prop_type': ['str', 'int', 'float', 'method', 'tuple', 'list', 'ndarray'],
         'valid_values': ['slider', 'image', 'graph', 'textarea'],
         'description': "Requests the GUI to render the element in a particular way"
     },
@@ -60,9 +60,41 @@ METADATA_SPECS = {
     },
     'displayName': {
         'type': ['str'],
-        'prop_type': ['method', 'int', 'float', 'str', 'list', 'ModelList', 'UserList'],
+        'prop_type': ['method', 'int', 'float', 'str', 'list', 'ModelList', 'UserList', 'ndarray'],
         'description': "Rename a property for GUI display, perhaps to a non-Pythonic string"
     },
+    'maxRate': {
+        'type': ['int', 'float'],
+        'prop_type': ['bool', 'int', 'float', 'str', 'list', 'ModelList', 'UserList', 'tuple', 'group', 'ndarray'],
+        'description': "Maximum rate (per second) of update notifications, always sending the latest value"
+    },
+    'deadband': {
+        'type': ['int', 'float'],
+        'prop_type': ['int', 'float', 'list', 'ModelList', 'UserList', 'tuple', 'ndarray'],
+        'description': "Minimum change of a value (element-wise for lists) since the last update notification to send a new one"
+    },
+    'deadbandMode': {
+        'type': ['str'],
+        'prop_type': ['int', 'float', 'list', 'ModelList', 'UserList', 'tuple', 'ndarray'],
+        'valid_values': ['absolute', 'relative'],
+        'description': "Whether `deadband` is an absolute change, or relative to the last value. The default is absolute"
+    },
+    'suppressUnchanged': {
+        'type': ['bool'],
+        'prop_type': ['bool', 'int', 'float', 'str', 'list', 'ModelList', 'UserList', 'tuple', 'group', 'ndarray'],
+        'description': "Whether to skip the update notification when a value equal to the last one notified is assigned"
+    },
+    'refreshExecutor': {
+        'type': ['str'],
+        'prop_type': ['bool', 'int', 'float', 'str', 'list', 'ModelList', 'UserList', 'tuple', 'group', 'ndarray'],
+        'valid_values': ['loop', 'thread', 'device'],
+        'description': "Where a `@refresh` attribute is read: on the server's loop, in a thread pool, or in a thread of its own for each interface"
+    },
+    'versionAttr': {
+        'type': ['str'],
+        'prop_type': ['bool', 'int', 'float', 'str', 'list', 'ModelList', 'UserList', 'tuple', 'group', 'ndarray'],
+        'description': "The name of an attribute next to a `@refresh` attribute that changes whenever it does, to read it only then"
+    },
     'collapsed': {
         'type': ['bool'],
         'prop_type': ['method', 'group', 'list', 'ModelList', 'UserList'],
@@ -109,10 +141,15 @@ def sanitize_metadata_entry(interface, prop_name, mdata, prop=None):
 
 
 def get_prop_type(prop):
+    from .model import ModelList # avoid a circular import
     if isinstance(prop, tuple(BASE_TYPES.values())):
         return type(prop).__name__
     elif inspect.ismethod(prop):
         return 'method'
+    elif isinstance(prop, ARRAY_TYPES):
+        return 'ndarray'
+    elif isinstance(prop, ModelList):
+        return 'ModelList'
     elif isinstance(prop, (list, tuple)):
         return type(prop[0]).__name__
     else:
@@ -1,12 +1,17 @@
 import inspect
 import types
 import itertools
+import functools
 import re
-from typing import Any, Union
+import typing
+import contextvars
+import weakref
+from typing import Any, Union, Tuple, Iterable
 from enum import Enum
 
-from .types import READONLY, BASE_TYPES
-from .metadata import sanitize_metadata_entry
+from .types import READONLY, BASE_TYPES, ARRAY_TYPES
+from .metadata import sanitize_metadata_entry, get_prop_type
+from .filters import Throttle, Deadband, Unchanged, fingerprint
 
 
 READONLY = 'readonly'
@@ -17,24 +22,387 @@ BASE_TYPES = {
     'bool': bool,
     'enum': str
 }
+_LEAF_TYPES = frozenset(BASE_TYPES.values())
+
+
+_PATH_RE = re.compile(r'([^.\[\]]+)|\[([^\]]*)\]')
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_path(name: str) -> tuple:
+    '''Split a dotted or bracketed name into the keys used to descend the model
+
+    example:
+    channels[3].voltage -> ('channels', 3, 'voltage')
+    channels.3.voltage -> ('channels', 3, 'voltage')
+    channels[].voltage -> ('channels', None, 'voltage')
+
+    Empty or templated indexes such as `[]` or `[{i}]` are returned as `None`,
+    to be filled in by `fill_path`.
+    '''
+    keys = []
+    for attribute, index in _PATH_RE.findall(name):
+        if attribute:
+            keys.append(int(attribute) if attribute.isdigit() else attribute)
+        else:
+            keys.append(int(index) if index.isdigit() else None)
+    return tuple(keys)
+
+
+def fill_path(keys: tuple, indexes: Iterable[int]) -> tuple:
+    '''Substitute `indexes`, in order, for all list indexes of a parsed path'''
+    indexes = iter(indexes)
+    return tuple(key if isinstance(key, str) else int(next(indexes)) for key in keys)
+
+
+# schema information shared by all instances of a class, see `Model._build_attributes`
+_PROPERTIES_CACHE = {}
+_METADATA_CACHE = weakref.WeakKeyDictionary() # class -> {(name, type): (mdata, snapshot, sanitized)}
+
+
+@functools.lru_cache(maxsize=None)
+def _class_members(cls) -> tuple:
+    '''Public attribute names defined along the MRO of `cls`, in lookup order'''
+    return tuple(dict.fromkeys(name for klass in cls.__mro__ if klass is not object
+                               for name in klass.__dict__ if not name.startswith('_')))
+
+
+@functools.lru_cache(maxsize=None)
+def _decorator_metadata(cls, name: str) -> dict:
+    '''Metadata attached to the class attribute `name` by the `@metadata` decorator'''
+    try:
+        name_class = getattr(cls, name)
+    except AttributeError:
+        return {}
+    if hasattr(name_class, '_object_metadata'):
+        return name_class._object_metadata
+    elif type(name_class) == property and hasattr(name_class.fget, '_object_metadata'):
+        return name_class.fget._object_metadata
+    return {}
+
+
+@functools.lru_cache(maxsize=None)
+def _enum_names(enum_cls) -> list:
+    '''The serialized names of all members of an Enum class'''
+    return list(dict.fromkeys(str(item.value) for item in enum_cls))
+
+
+@functools.lru_cache(maxsize=None)
+def _enum_maps(enum_cls) -> Tuple[dict, dict]:
+    '''The lookup tables of an Enum class, shared by all `ModelEnum` nodes of that class:
+    serialized value -> member, and member -> serialized value'''
+    value_map = {str(item.value): item for item in enum_cls}
+    return value_map, {v: k for k, v in value_map.items()}
+
+
+@functools.lru_cache(maxsize=None)
+def _typed_placeholder(cls, name: str):
+    '''A stand-in value for a property or descriptor of `cls` whose type is known statically,
+    from the return annotation of the getter or the class annotations, or None.
+
+    Only base types and Enum classes qualify, since the schema of anything else
+    (e.g. the length of a list) depends on the actual value.
+    '''
+    for klass in cls.__mro__:
+        if name in klass.__dict__:
+            attr = klass.__dict__[name]
+            break
+    else: # an attribute initialized during instantiation
+        return None
+    if not hasattr(type(attr), '__get__') or isinstance(attr, (types.FunctionType, staticmethod, classmethod)):
+        return None # a plain class attribute or a method, which is not expensive to read
+    try:
+        if isinstance(attr, property):
+            annotation = typing.get_type_hints(attr.fget).get('return')
+        else:
+            annotation = typing.get_type_hints(cls).get(name)
+    except Exception: # unresolvable forward references
+        return None
+    if annotation in BASE_TYPES.values():
+        return annotation()
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return next(iter(annotation), None)
+    return None
+
+
+def _sanitized_metadata(interface, name: str, mdata: dict, prop) -> dict:
+    '''Sanitize a metadata entry, reusing the result for all instances of a class
+    if the entry is defined on the class, in its `_metadata` or by the `@metadata` decorator'''
+    cls = type(interface)
+    if mdata is not getattr(cls, '_metadata', {}).get(name) and mdata is not _decorator_metadata(cls, name):
+        return sanitize_metadata_entry(interface, name, mdata, prop=prop)[name] # per-instance metadata
+    entries = _METADATA_CACHE.setdefault(cls, {})
+    key = (name, get_prop_type(prop))
+    try:
+        cached_mdata, snapshot, sanitized = entries[key]
+        if cached_mdata is mdata and snapshot == mdata:
+            return sanitized
+    except KeyError:
+        pass
+    sanitized = sanitize_metadata_entry(interface, name, mdata, prop=prop)[name]
+    entries[key] = (mdata, dict(mdata), sanitized)
+    return sanitized
+
+
+def _child_node(parent, key, value):
+    '''Return the child node of `parent` at `key`, reusing the cached node
+    unless the attribute or item has been rebound to a new object since.'''
+    child = parent._children.get(key)
+    if child is None and type(value) in _LEAF_TYPES: # the common case of a base type value
+        return value
+    if child is None and isinstance(value, ARRAY_TYPES):
+        # arrays are leaves, but keep their dtype and shape in the schema up to date
+        props = parent._props.get(key) if isinstance(parent, Model) else None
+        if props is not None and 'shape' in props and props['shape'] != list(value.shape):
+            props.update(_array_props(value))
+        return value
+    if child is not None and (child._interface is value or getattr(value, '__data_model__', None) is child):
+        return child
+    rebound = child is not None
+    if rebound: # number the new nodes after all others, as `Model._expand` does
+        parent.__index__ = parent._root.__index__
+    child = Model(value, parent=parent, name=str(key))
+    if isinstance(child, (Model, ModelList, ModelEnum)):
+        parent._children[key] = child
+    else:
+        parent._children.pop(key, None)
+    if rebound:
+        _schema_changed(parent, key, child, rebound=True)
+        root = parent._root
+        root.__index__ = max(root.__index__, parent.__index__, getattr(child, '__index__', 0))
+    return child
+
+
+def _serialize_leaves(items):
+    '''Serialize a list, or nested lists, of base type items in bulk,
+    or return None if any item needs to be serialized through the model'''
+    item_types = set(map(type, items))
+    if item_types <= _LEAF_TYPES:
+        return list(items)
+    if item_types <= _LIST_TYPES:
+        rows = [_serialize_leaves(item) for item in items]
+        if None not in rows:
+            return rows
+    return None
+
+
+def _array_props(array) -> dict:
+    return {'dtype': str(array.dtype), 'shape': list(array.shape)}
+
+
+def _array_item(node, name, array, index: tuple, value: Any = None):
+    '''Read or write (in place) the element or slice `array[index]`,
+    where `array` is the item `name` of `node`.'''
+    if value is None:
+        item = array[index]
+        return item if isinstance(item, ARRAY_TYPES) else item.item()
+    array[index] = value
+    # there is no __setitem__ of the array to hook into, so notify here
+    path = '.'.join(str(key) for key in (name, *index))
+    _notify_change(node, path, lambda: array[index].tolist(), value)
+
+
+def _listening(node) -> bool:
+    '''Whether anyone subscribes to the notifications of the model of `node`'''
+    root = node._root
+    return root is not None and bool(root.events)
+
+
+def _attach(node, name):
+    '''Attach a node to a list or object assigned to `name` right away (see `_child_node`),
+    so that the changes of its items or attributes are notified even if it is not serialized,
+    e.g. if its subscribers only want names'''
+    try:
+        node[name]
+    except (KeyError, IndexError, AttributeError):
+        pass
+
+
+_NO_VALUE = object()
+
+
+def _notify_change(node, name, serialize, value=_NO_VALUE):
+    '''Notify the subscribers of the model of a change of the item `name` of `node`.
+
+    Nothing is done unless someone subscribes to `name`, and the new value is only
+    serialized, once, with `serialize()` if a subscriber needs values rather than names.
+    If the assigned `value` is given, assignments of an unchanged value are not
+    notified if the model (or the property's metadata) asks to suppress them, and
+    an assigned list or object is attached to a node of its own for its changes.
+    '''
+    root = node._root
+    if root is None: # a list outside of a model
+        return
+    if not root.events:
+        if root._unchanged: # values may change unnoticed until someone listens again
+            root._unchanged.clear()
+        return
+    if type(value) not in _LEAF_TYPES and value is not _NO_VALUE and \
+            not isinstance(value, (Enum, *ARRAY_TYPES)) and root._lock:
+        _attach(node, name)
+    path = node.parent_name + str(name)
+    unchanged = None
+    if value is not _NO_VALUE and root._lock:
+        unchanged = root._filter(path)[2]
+        if unchanged is not None:
+            keys = parse_path(path)
+            value_fingerprint = fingerprint(value)
+            if unchanged.unchanged(keys, value_fingerprint):
+                return
+    _notify_name(root, path, serialize)
+    if unchanged is not None:
+        unchanged.remember(keys, value_fingerprint)
+
+
+def _notify_name(root, name, serialize):
+    pending = _batch.get()
+    if pending is not None and root in pending.changes:
+        # keep the last change of each name, in the order of the last changes
+        changes = pending.changes[root]
+        changes.pop(name, None)
+        changes[name] = serialize
+        return
+    _emit_change(root, name, serialize)
+
+
+def _emit_change(root, name, serialize):
+    wants = root.events.wants(name)
+    if wants:
+        root.emit({'name': name, 'value': serialize()})
+    elif wants is not None:
+        root.emit({'name': name})
+
+
+_batch = contextvars.ContextVar('batch', default=None)
+
+
+class batch:
+    '''Defers the notifications of changes to the model of `interface` until the end of
+    a `with` block, then notifies each changed name once with its final value, e.g.
+
+        with slapdash.batch(self):
+            self.amplitude = 1.0
+            self.frequency = 1e3
+
+    Settings changed in the block are also saved once by a `Saver`. Only the changes made
+    in the block's thread or asyncio task (and the tasks it starts) are deferred.
+    Blocks can be nested. A block does nothing if `interface` has no model (yet), e.g. in
+    its `__init__`, since no one can listen to its changes then.
+    '''
+
+    def __init__(self, interface):
+        model = getattr(interface, '__data_model__', None)
+        self._root = model._root if model is not None else None
+        self._token = None
+
+    def __enter__(self):
+        if self._root is None:
+            return self
+        pending = _batch.get()
+        if pending is None:
+            pending = _Batch()
+            self._token = _batch.set(pending)
+        pending.changes.setdefault(self._root, {})
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._token is None: # an inner block
+            return
+        pending = _batch.get()
+        changes, pending.changes = pending.changes, {}
+        try:
+            for root, names in changes.items():
+                for name, serialize in names.items():
+                    _emit_change(root, name, serialize)
+        finally:
+            _batch.reset(self._token)
+            self._token = None
+            # tasks started in the block still see it, but it has ended for them too
+            after, pending.after = pending.after, None
+            for callback in after:
+                callback()
+
+
+class _Batch:
+    __slots__ = ('changes', 'after')
+
+    def __init__(self):
+        self.changes = {} # root -> {name: serialize}
+        self.after = {} # callbacks to run once at the end, e.g. to write the settings file
+
+
+def _defer_to_batch(callback) -> bool:
+    '''Run `callback` once at the end of the current `batch`, if any, rather than now'''
+    pending = _batch.get()
+    if pending is None or pending.after is None:
+        return False
+    pending.after[callback] = None
+    return True
+
+
+def _schema_changed(node, name, child=None, rebound=False):
+    '''Update the schema of the nearest `Model` at or above `node` after its child
+    `name` was rebuilt (as `child`, if known), and drop the cached flat schemas of all
+    of its ancestors. A `rebound` child of the same structure as before changes nothing.'''
+    while not isinstance(node, Model):
+        node, name, child = node._parent, node._name, None
+        if node is None:
+            return
+    if name in node._props:
+        # a property returns a new object on each read, so do not read it again
+        prop_type = node._get_type(node[name] if child is None else child)
+        old_type = node._props[name]['type']
+        if rebound and prop_type == old_type: # e.g. a new list of the same length
+            return
+        if rebound and _structure(prop_type) == _structure(old_type):
+            # e.g. a property returning a new object of the same class on each read
+            _adopt_indexes(old_type, prop_type)
+            return
+        node._props[name]['type'] = prop_type
+    while node is not None:
+        if isinstance(node, Model):
+            node._flat_props = None
+            node._name_dict = None
+            node._filters = None
+        node = node._parent
+
+
+def _structure(prop_type):
+    '''The type of a prop without the indexes of the props in it, to compare schemas'''
+    if isinstance(prop_type, dict):
+        return {name: {key: _structure(value) if key == 'type' else value
+                       for key, value in prop.items() if key != 'index'}
+                for name, prop in prop_type.items()}
+    if isinstance(prop_type, list):
+        return [_structure(item) for item in prop_type]
+    return prop_type
+
+
+def _adopt_indexes(old_type, prop_type):
+    '''Give the props in `prop_type` the indexes of those in `old_type`, of the same structure'''
+    if isinstance(prop_type, dict):
+        for name, prop in prop_type.items():
+            prop['index'] = old_type[name]['index']
+            _adopt_indexes(old_type[name]['type'], prop['type'])
+    elif isinstance(prop_type, list):
+        for old_item, item in zip(old_type, prop_type):
+            _adopt_indexes(old_item, item)
 
 
 class ModelList:
-    _interface = None
-    _parent: Any = None
-    _name: str = None
-    _root: Any = None
-    __index__: int = 0
+    __slots__ = ('_interface', '_parent', '_name', '_root', '_children', '_parent_name', '__index__')
 
     def __init__(self, interface, parent=None, name=''):
         if not parent:
-            root = self._root
+            root = None
         else:
             root = parent._root
 
         try: # has a __data_model__ (not a vanilla list)
             interface.__data_model__ = self
         except AttributeError:
+            # wrap a vanilla list once and put it in place of the original in the parent,
+            # so that the model and the user's code share the same storage from then on
             interface = UserList(interface)
             interface.__data_model__ = self
             try:
@@ -64,25 +432,22 @@ class ModelList:
         # except AttributeError:
         #     pass
 
-        if type(parent) == ModelList:
-            self._interface = UserList(parent._interface[int(name)])
-        else:
-            self._interface = interface
+        self._interface = interface
         self._parent = parent
         self._name = name
         self._root = root
+        self._children = {}
+        self._parent_name = None
 
         self._attach_emit()
-        if parent is not None:
-            self.__index__ = parent.__index__
+        self.__index__ = parent.__index__ if parent is not None else 0
 
     def __getitem__(self, index):
         if isinstance(index, str):
             index = int(index)
-        return Model(self._interface[index], parent=self, name=str(index))
+        return _child_node(self, index, self._interface[index])
 
     def __setitem__(self, index, value):
-        parent = self._parent
         if isinstance(index, str):
             index = int(index)
         obj = self[index]
@@ -95,19 +460,9 @@ class ModelList:
         elif isinstance(obj, ModelEnum):
             new_enum = obj._get_from_name(value)
             self._interface[index] = new_enum
-        elif isinstance(parent, ModelList):
-            # for deep lists, we need to set from the outermost list
-            args = [int(self._name)]
-            while isinstance(parent._parent, ModelList):
-                args.append(int(parent._name))
-                parent = parent._parent
-            superparent = parent
-
-            pif = superparent._interface
-            for arg in args[::-1]:
-                pif = pif[arg]
-            pif[index] = value
-        else:
+        elif isinstance(obj, ARRAY_TYPES):
+            _array_item(self, index, obj, (), value)
+        else: # nested lists are installed in their parent list, see `__init__`
             self._interface[index] = value
 
     # this is a somewhat strange __contains__
@@ -122,14 +477,17 @@ class ModelList:
 
     @property
     def parent_name(self):
+        # the position of a list in the model does not change, so its name is cached
+        if self._parent_name is not None:
+            return self._parent_name
         if self._parent is None:
             # None during debugging during model buildup
             if self._name == '' or self._name is None:
                 return ''
             else:
                 return self._name + '.'
-        else:
-            return self._parent.parent_name + self._name + '.'
+        self._parent_name = self._parent.parent_name + self._name + '.'
+        return self._parent_name
 
     def _attach_emit(self):
         # overload the __setitem__ method of the passed in interface
@@ -142,14 +500,26 @@ class ModelList:
             def __notifysetitem__(interface, index, value):
                 temp_setitem(interface, index, value)
                 if hasattr(interface, '__data_model__'):
-                    parent_name = interface.__data_model__.parent_name
-                    serialized_value = Model.serialize(self, Model(value))
-                    interface.__data_model__.emit({'name': f'{parent_name}{index}', 'value': serialized_value})
+                    model = interface.__data_model__
+                    if type(value) in _LEAF_TYPES:
+                        _notify_change(model, index, lambda: value, value)
+                    else:
+                        _notify_change(model, index, lambda: Model.serialize(self, model[index]), value)
 
             self._interface.__class__.__setitem__ = __notifysetitem__
 
     def serialize(self):
-        return [Model.serialize(self, Model(item)) for item in self._interface]
+        # the common case of (nested) lists of numbers or strings
+        serialized = _serialize_leaves(self._interface)
+        if serialized is not None:
+            return serialized
+        return [Model.serialize(self, self[index]) for index in range(len(self._interface))]
+
+    def _expand_tree(self):
+        for index in range(len(self._interface)):
+            node = self[index]
+            if isinstance(node, (Model, ModelList)):
+                node._expand_tree()
 
     def emit(self, message):
         if self._parent is not None:
@@ -163,24 +533,30 @@ class UserList(list):
         super().__init__(__list)
 
 
+_LIST_TYPES = frozenset((list, UserList))
+
+
 class ModelEnum:
-    _interface = None
-    _parent: Any = None
-    _name: str = None
+    __slots__ = ('_interface', '_parent', '_name')
 
     def __init__(self, interface, parent=None, name=''):
         interface.__data_model__ = self
         self._interface = interface
         self._parent = parent
         self._name = name
-        self._value_map = {str(item.value): item for item in type(interface)}
-        self._member_map = {v: k for k, v in self._value_map.items()}
-        self._enums = list(self._value_map.keys())
+
+    @property
+    def _value_map(self):
+        return _enum_maps(type(self._interface))[0]
+
+    @property
+    def _enums(self):
+        return _enum_names(type(self._interface))
 
     def serialize(self):
         # used to get the prop from a client
         # p = client.enum_prop
-        return self._member_map[self._interface]
+        return _enum_maps(type(self._interface))[1][self._interface]
 
     def _get_from_name(self, name):
         # used to set the prop from a client
@@ -202,18 +578,16 @@ class Model:
     When initialized, this explores the passed in object 'interface' and creates a hierachical dictionary of that objects attributes.
     '''
 
-    _interface: Any = None
-    _root: Any = None
-    _parent: Any = None
-    _name: str = None
-    _props: dict = {}
-    _name_dict: dict = {}
-    _lock: bool = False
-    __index__: int = 0
+    # the last nine are only used by the root node
+    __slots__ = ('_interface', '_root', '_parent', '_name', '_props', '_children', '_flat_props',
+                 '_name_dict', '_lock', '__index__', '_paths', '_lazy', '_static_types', '_on_expand', 'events',
+                 '_suppress_unchanged', '_unchanged', '_filters', '_filter_state')
 
-    def __new__(cls, interface, parent=None, name=None):
+    def __new__(cls, interface, parent=None, name=None, *args, **kwargs):
         if isinstance(interface, tuple(BASE_TYPES.values())) and not isinstance(interface, Enum):
             return interface
+        elif isinstance(interface, ARRAY_TYPES):
+            return interface
         elif inspect.ismethod(interface):
             return interface
         elif isinstance(interface, (list, tuple)):
@@ -232,35 +606,78 @@ class Model:
             return ModelEnum(interface, parent, name)
         return super(Model, cls).__new__(cls)
 
-    def __init__(self, interface, parent=None, name='', *args, **kwargs):
+    def __init__(self, interface, parent=None, name='', lazy: bool = False, static_types: bool = False,
+                 suppress_unchanged: bool = False, *args, **kwargs):
+        '''If `lazy` is True, only the attributes of the top level object are explored
+        here, and each sub-object is explored on its first access.
+
+        If `static_types` is True, properties and other descriptors annotated with a base type
+        or an Enum class (e.g. `def voltage(self) -> float`) are not read to build the model.
+
+        If `suppress_unchanged` is True, assigning a value equal to the value last notified
+        does not notify a change. The `suppressUnchanged` metadata overrides this per property.'''
         interface.__data_model__ = self
         self._interface = interface
         self._parent = parent
         self._name = name
         self._props = {}
+        self._children = {}
+        self._flat_props = None
+        self._name_dict = None
+        self._filters = None
+        self._lock = False
+        self.__index__ = 0
+        # the parsed keys of every name in the flat schema, see `flat_props` and `_value_by_name`
+        self._paths = None
         if not self._parent:
             self._root = self
+            self._lazy = lazy
+            self._static_types = static_types
+            self._on_expand = []
+            self._suppress_unchanged = suppress_unchanged
+            self._unchanged = None
+            self._filter_state = {}
+            from .events import EventBus
+            # the subscribers of the notifications of the model, see `emit`
+            self.events = EventBus()
         else:
             self._root = self._parent._root
+        self._attach_emit(interface)
 
-        if parent is not None:
+        if parent is None:
+            self._build_attributes(interface)
+            self._lock = True
+            self.flat_props() # and the index of the names in it
+        elif not self._root._lazy:
             self.__index__ = parent.__index__
-        self._build_attributes(interface)
-        if parent is not None:
+            self._build_attributes(interface)
             parent.__index__ = self.__index__
+            self._lock = True
 
-        self._name_dict = {value['index']: name for name,
-                           value in self.flat_props().items()}
+    def _expand(self):
+        '''Explore the attributes of a lazily constructed node on its first access'''
+        if self._lock:
+            return
+        root = self._root
+        self.__index__ = root.__index__
+        self._build_attributes(self._interface)
+        root.__index__ = self.__index__
         self._lock = True
+        # the node's props are already referenced by its parent's schema
+        _schema_changed(self._parent, self._name)
+        for callback in root._on_expand:
+            callback(self)
 
     def __repr__(self):
         return str(self.serialize())
 
     def __contains__(self, key):
+        self._expand()
         return key in self._props.keys()
 
     def __setitem__(self, key, value):
          # e.g. for calls to arr[index1][index2] (n times, n>=1)
+        self._expand()
         if key not in self._props.keys():
             self._set(key, value)
         else:
@@ -276,15 +693,19 @@ class Model:
                 # cannot coincide with its serialized version (a string)
                 new_enum = obj._get_from_name(value)
                 self._interface.__setattr__(key, new_enum)
+            elif isinstance(obj, ARRAY_TYPES):
+                # write arrays in place, e.g. from a list
+                _array_item(self, key, obj, (), value)
             else:
                 self._interface.__setattr__(key, value)
 
     def __getitem__(self, key):
         if key is None or key == '':
             return self
+        self._expand()
         if key not in self._props.keys():
             return self._get(key)
-        return Model(self._interface.__getattribute__(key), parent=self, name=key)
+        return _child_node(self, key, self._interface.__getattribute__(key))
 
     @property
     def _index(self):
@@ -309,32 +730,53 @@ class Model:
         else:
             return self._parent.parent_name + self._name + '.'
 
+    def _expand_tree(self):
+        '''Explore the complete subtree of a lazily constructed node'''
+        self._expand()
+        for key, prop in self._props.items():
+            if isinstance(prop['type'], (dict, list)):
+                node = self[key]
+                if isinstance(node, (Model, ModelList)):
+                    node._expand_tree()
+
     def props(self, name: Union[str, int] = None):
         if name is None:
+            self._expand()
             return self._props
-        if hasattr(self[self._lookup(name)], '_props'):
-            return self[self._lookup(name)]._props
+        node = self[self._lookup(name)]
+        if isinstance(node, Model):
+            node._expand()
+        if hasattr(node, '_props'):
+            return node._props
         else:
             return None
 
     def flat_props(self, name: Union[str, int] = None):
-        return self._flatten_props(self.props(name))
-
-    def _flatten_props(self, props, parent=''):
-        flat_props = {}
+        if name is not None:
+            return self._flatten_props(self.props(name))
+        # the flat schema is cached until a child is rebound or expanded, see `_schema_changed`
+        self._expand()
+        if self._flat_props is None:
+            self._flat_props = self._flatten_props(self._props)
+            if self._parent is None:
+                self._paths = {name: parse_path(name) for name in self._flat_props}
+        return self._flat_props
+
+    def _flatten_props(self, props, parent='', flat_props=None):
+        if flat_props is None:
+            flat_props = {}
         for name, prop in props.items():
             if isinstance(prop['type'], dict):
-                flat_props = {**flat_props, **
-                              self._flatten_props(prop['type'], f'{parent}{name}.')}
+                self._flatten_props(prop['type'], f'{parent}{name}.', flat_props)
             elif isinstance(prop['type'], (list, tuple)):
                 for index, item in enumerate(prop['type']):
                     if isinstance(item, dict):
-                        flat_props = {
-                            **flat_props, **self._flatten_props(item, f'{parent}{name}[{index}].')}
+                        self._flatten_props(item, f'{parent}{name}[{index}].', flat_props)
             flat_props[parent + name] = prop
         return flat_props
 
     def flatten(self, parent=''):
+        self._expand()
         flat = {}
         for key in self._props.keys():
             value = self[key]
@@ -354,12 +796,15 @@ class Model:
         if interface is not None:
             if isinstance(interface, (Model, ModelList, ModelEnum)):
                 return interface.serialize()
+            elif isinstance(interface, ARRAY_TYPES):
+                return interface.tolist()
             elif inspect.ismethod(interface):
                 return f"{props['name']}({', '.join((name for name, annotation in props['args']))})"
             else:
                 return interface
         else:
             # when we serialize, make sure to grab a current value from the interface
+            self._expand()
             return {key: self.serialize(self[key], self._props[key]) for key in self._props.keys()}
 
     def _build_attributes(self, interface):
@@ -367,6 +812,43 @@ class Model:
             raise RuntimeError(
                 "cannot access _build_attributes after __init__")
 
+        members = dict.fromkeys(itertools.chain(interface.__dict__, _class_members(type(interface))))
+        for name in members:
+            if not name.startswith('_'):
+                # include decorator metadata prior to Model build-up in case it changes outcome
+                # variables created in __init__ will not be in __class__, but cannot be decorated anyway
+                extra_metadata = _decorator_metadata(type(interface), name)
+                if extra_metadata:
+                    if hasattr(interface, '_metadata'):
+                        try:
+                            interface._metadata[name].update(extra_metadata)
+                        except KeyError:
+                            interface._metadata[name] = extra_metadata
+                    else:
+                        interface._metadata = {name: extra_metadata}
+
+                value = _typed_placeholder(type(interface), name) if self._root._static_types else None
+                if value is None:
+                    value = interface.__getattribute__(name)
+                    obj = _child_node(self, name, value)
+                    prop_type = self._get_type(obj)
+                else: # known without reading the attribute
+                    obj = value
+                    prop_type = 'enum' if isinstance(value, Enum) else type(value).__name__
+                self._props[name] = {
+                    'name': name,
+                    'type': prop_type,
+                    **self._get_properties(interface, name, value),
+                    'index': self._index
+                }
+
+                if isinstance(value, ARRAY_TYPES):
+                    self._props[name].update(_array_props(value))
+
+                if hasattr(interface, '_metadata') and name in interface._metadata:
+                    self._props[name]['metadata'] = _sanitized_metadata(interface, name, interface._metadata[name], obj)
+
+    def _attach_emit(self, interface):
         # overload the __setattr__ method of the passed in interface
         # to provide notifications via emit(),
         # where setting now happens prior to notification
@@ -377,128 +859,89 @@ class Model:
             def __notifysetattr__(interface, name, value):
                 temp_setattr(interface, name, value)
                 if not name.startswith('_') and hasattr(interface, '__data_model__'):
-                    parent_name = interface.__data_model__.parent_name
-                    try: # I think some different cases here can depend on how dynamically the model is initialized
-                        serialized_value = interface.__data_model__.serialize(interface.__data_model__[name])
-                    except KeyError:
-                        serialized_value = self.serialize(self[name])
-                    interface.__data_model__.emit({'name': parent_name + name, 'value': serialized_value})
+                    model = interface.__data_model__
+
+                    def serialize():
+                        try: # I think some different cases here can depend on how dynamically the model is initialized
+                            return model.serialize(model[name])
+                        except KeyError:
+                            return self.serialize(self[name])
+                    _notify_change(model, name, serialize, value)
 
             try:
                 interface.__class__.__setattr__ = __notifysetattr__
             except TypeError:
                 print('can not overload function __setattr__')
 
-        cls_dict = (cls.__dict__ for cls in type(
-            interface).__mro__ if cls is not object)
-        members = itertools.chain(interface.__dict__, *cls_dict)
-        for name in members:
-            if not name.startswith('_'):
-                # include decorator metadata prior to Model build-up in case it changes outcome
-                extra_metadata = {}
-                try:
-                    name_class = getattr(interface.__class__, name)
-                    if hasattr(name_class, '_object_metadata'): # metadata added by decorator
-                        extra_metadata = name_class._object_metadata
-                    elif type(name_class) == property:
-                        if hasattr(name_class.fget, '_object_metadata'):
-                            extra_metadata = getattr(name_class.fget, '_object_metadata')
-                    if extra_metadata:
-                        if hasattr(interface, '_metadata'):
-                            try:
-                                interface._metadata[name].update(extra_metadata)
-                            except KeyError:
-                                interface._metadata[name] = extra_metadata
-                        else:
-                            interface._metadata = {name: extra_metadata}
-                # variables created in __init__ will not be in __class__, but cannot be decorated anyway
-                except AttributeError:
-                    pass
-
-                value = interface.__getattribute__(name)
-                obj = Model(value, parent=self, name=name)
-                self._props[name] = {
-                    'name': name,
-                    'type': self._get_type(obj),
-                    **self._get_properties(interface, name),
-                    'index': self._index
-                }
-
-                if hasattr(interface, '_metadata') and name in interface._metadata:
-                    _metadata = sanitize_metadata_entry(interface, name, interface._metadata[name], prop=obj)
-                    self._props[name]['metadata'] = _metadata[name]
-
     def _get_type(self, interface):
         if isinstance(interface, tuple(BASE_TYPES.values())):
             return type(interface).__name__
         elif inspect.ismethod(interface):
             return type(interface).__name__
         elif isinstance(interface, ModelList):
+            items = interface._interface
+            if set(map(type, items)) <= _LEAF_TYPES: # the common case of a list of base types
+                return [type(item).__name__ for item in items]
             return [self._get_type(item) for item in interface]
         elif isinstance(interface, ModelEnum):
             return 'enum'
         elif isinstance(interface, Model):
             return interface._props
-        elif isinstance(interface, (list, tuple)):
+        elif isinstance(interface, (list, tuple) + ARRAY_TYPES):
             return 'array'
         else:
             raise TypeError(f'{interface} is an unknown type')
 
-    def _get_properties(self, obj, name):
+    def _get_properties(self, obj, name, value):
         '''finds optional properties of an objects attributes
 
         if an attribute is a @property without a setter, then it is is given the prop 'readonly'
 
         if an attribute is a @property or a function with a defined __doc__ string then it is given the prop doc
+
+        The properties only depend on the class of `obj` and the type of the attribute `value`,
+        so they are computed once and shared by all instances of a class.
         '''
+        if isinstance(value, types.FunctionType): # a function assigned to an instance
+            return self._find_properties(obj, name, value)
+        key = (type(obj), name, type(value), value.__func__ if isinstance(value, types.MethodType) else None)
+        try:
+            return _PROPERTIES_CACHE[key]
+        except KeyError:
+            props = _PROPERTIES_CACHE[key] = self._find_properties(obj, name, value)
+            return props
+
+    def _find_properties(self, obj, name, value):
         props = {}
-        # CM: I suspect that the loop is at this point equivalent to
-        # attr = getattr(obj, name)
         for cls in type(obj).__mro__:
-            # print(name, issubclass(cls, type(self)))
             if cls is not object:
                 if name in cls.__dict__: # a hard-coded class attribute
                     attr = cls.__dict__[name]
-                    if isinstance(attr, property):
-                        if attr.fset is None:
-                            props[READONLY] = True
-                    if isinstance(attr, types.FunctionType):
-                        props[READONLY] = True
-                        props['args'] = tuple(((key.name, key.annotation.__name__ if key.annotation is not inspect._empty else None)
-                                               for key in inspect.signature(attr).parameters.values()))[1:]
-                    if isinstance(attr, (property, types.FunctionType)):
-                        if attr.__doc__ is not None:
-                            props['doc'] = attr.__doc__
-                    elif not isinstance(attr, tuple(list(BASE_TYPES.values()) + [UserList, Enum, tuple, list])):
-                        if attr.__doc__ is not None:
-                            props['doc'] = attr.__doc__
-                    if isinstance(attr, Enum):
-                        props['enums'] = ModelEnum(attr)._enums
-                    if isinstance(attr, property) and isinstance(attr.fget(obj), Enum):
-                        props['enums'] = ModelEnum(attr.fget(obj))._enums
                 else: # an attribute initialized during instantiation
-                    attr = getattr(obj, name)
-                    if isinstance(attr, property):
-                        if attr.fset is None:
-                            props[READONLY] = True
-                    if isinstance(attr, types.FunctionType):
+                    attr = value
+                if isinstance(attr, property):
+                    if attr.fset is None:
                         props[READONLY] = True
-                        props['args'] = tuple(((key.name, key.annotation.__name__ if key.annotation is not inspect._empty else None)
-                                               for key in inspect.signature(attr).parameters.values()))[1:]
-                    if isinstance(attr, (property, types.FunctionType)):
-                        if attr.__doc__ is not None:
-                            props['doc'] = attr.__doc__
-                    elif not isinstance(attr, tuple(list(BASE_TYPES.values()) + [UserList, Enum, tuple, list])):
-                        if attr.__doc__ is not None:
-                            props['doc'] = attr.__doc__
-                    if isinstance(attr, Enum):
-                        props['enums'] = ModelEnum(attr)._enums
-                    if isinstance(attr, property) and isinstance(attr.fget(obj), Enum):
-                        props['enums'] = ModelEnum(attr.fget(obj))._enums
+                if isinstance(attr, types.FunctionType):
+                    props[READONLY] = True
+                    props['args'] = tuple(((key.name, key.annotation.__name__ if key.annotation is not inspect._empty else None)
+                                           for key in inspect.signature(attr).parameters.values()))[1:]
+                if isinstance(attr, (property, types.FunctionType)):
+                    if attr.__doc__ is not None:
+                        props['doc'] = attr.__doc__
+                elif not isinstance(attr, tuple(list(BASE_TYPES.values()) + [UserList, Enum, tuple, list]) + ARRAY_TYPES):
+                    if attr.__doc__ is not None:
+                        props['doc'] = attr.__doc__
+                if isinstance(attr, Enum):
+                    props['enums'] = _enum_names(type(attr))
+                if isinstance(attr, property) and isinstance(value, Enum):
+                    props['enums'] = _enum_names(type(value))
         return props
 
     def _lookup(self, value: Union[str, int]) -> str:
         if isinstance(value, int):
+            if self._name_dict is None:
+                self._name_dict = {prop['index']: name for name, prop in self.flat_props().items()}
             return self._name_dict[value]
         elif isinstance(value, str):
             return value
@@ -511,18 +954,88 @@ class Model:
         self._value_by_name(self._lookup(name), value)
 
     def _value_by_name(self, name: str, value: Any = None):
+        keys = self._paths.get(name) if self._paths is not None else None
+        if keys is None: # e.g. `channels.3` rather than `channels[3]`, or an element of an array
+            keys = parse_path(name)
+        return self._value_by_path(keys, value, name=name)
+
+    def _value_by_path(self, keys: Tuple[Union[str, int], ...], value: Any = None, name: str = None):
         obj = self
-        attributes = re.sub(r'\[(\d+)\]', r'.\1', name).split('.')
-        for attribute in attributes[:-1]:
-            obj = obj[attribute]
+        for depth, key in enumerate(keys[:-1]):
+            node, obj = obj, obj[key]
+            if isinstance(obj, ARRAY_TYPES): # the remaining keys index into the array
+                return _array_item(node, key, obj, keys[depth + 1:], value)
 
-        if attributes[-1] not in obj:
-            raise KeyError(name)
+        if not keys or keys[-1] not in obj:
+            raise KeyError(name if name is not None else keys)
         if value is None:
-            return obj[attributes[-1]]
+            return obj[keys[-1]]
         else:
-            obj[attributes[-1]] = value
+            obj[keys[-1]] = value
 
     def emit(self, message):
         if self._parent is not None:
             self._parent.emit(message)
+        else:
+            # all notifications pass here, whether from the REST API, a driver thread or @refresh
+            if self._lock and 'name' in message:
+                deadband, throttle, _ = self._filter(message['name'])
+            else:
+                deadband, throttle = None, None
+            if deadband is not None and 'value' in message and not deadband(message):
+                return
+            if self._unchanged and 'name' in message: # the value notified is no longer the one assigned last
+                self._unchanged.remember(parse_path(message['name']))
+            if throttle is not None:
+                throttle(message)
+            else:
+                self._deliver(message)
+
+    def _deliver(self, message):
+        self.events.publish(message)
+
+    def _filter(self, name: str) -> tuple:
+        '''The deadband, throttle and fingerprints of unchanged values (each may be None) of the
+        property `name`, or of the closest property containing it (e.g. a list), from its `deadband`,
+        `maxRate` and `suppressUnchanged` metadata'''
+        if self._filters is None:
+            self._filters = {}
+            # keep the fingerprints when the schema changes, e.g. when a list is reassigned
+            unchanged = self._unchanged if self._unchanged is not None else Unchanged()
+            default = unchanged if self._suppress_unchanged else None
+            # and the filters of each property, with what they remember, see `_reuse_filter`
+            previous, self._filter_state = self._filter_state, {}
+            for prop_name, prop in self.flat_props().items():
+                mdata = prop.get('metadata', {})
+                keys = parse_path(prop_name)
+                deadband, throttle, suppress = None, None, default
+                if mdata.get('deadband') is not None:
+                    relative = mdata.get('deadbandMode') == 'relative'
+                    deadband = self._reuse_filter(previous, keys, 'deadband', (mdata['deadband'], relative),
+                                                  lambda: Deadband(mdata['deadband'], relative=relative))
+                if mdata.get('maxRate') is not None and mdata['maxRate'] > 0:
+                    throttle = self._reuse_filter(previous, keys, 'maxRate', mdata['maxRate'],
+                                                  lambda: Throttle(mdata['maxRate'], self._deliver))
+                if mdata.get('suppressUnchanged') is not None:
+                    suppress = unchanged if mdata['suppressUnchanged'] else None
+                if deadband is not None or throttle is not None or suppress is not default:
+                    self._filters[keys] = (deadband, throttle, suppress)
+            self._filters[()] = (None, None, default)
+            if any(filters[2] is not None for filters in self._filters.values()):
+                self._unchanged = unchanged
+            else:
+                self._unchanged = None
+        keys = parse_path(name)
+        for depth in range(len(keys), -1, -1):
+            filters = self._filters.get(keys[:depth])
+            if filters is not None:
+                return filters
+
+    def _reuse_filter(self, previous: dict, keys: tuple, kind: str, params, create):
+        '''The filter `kind` of the property `keys` from before the schema was rebuilt, if its
+        parameters `params` are the same, or else a new one from `create()`'''
+        params_filter = previous.get((keys, kind))
+        if params_filter is None or params_filter[0] != params:
+            params_filter = (params, create())
+        self._filter_state[keys, kind] = params_filter
+        return params_filter[1]
@@ -0,0 +1,192 @@
+'''
+Hand notifications over from any thread to the event loop of the server, and on to web clients
+'''
+import asyncio
+import logging
+import time
+from collections import deque, OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+_BACKLOG_POLL = 0.02 # seconds between checks of a congested client's transport
+
+
+class Notifier:
+    '''A queue of notifications delivered by a single consumer task on the server's event loop.
+
+    `publish` can be called from any thread (a driver thread, a FastAPI threadpool
+    handler or the loop itself) and only appends to a deque, waking the consumer up
+    with `call_soon_threadsafe` at most once per batch of notifications.
+
+    The notifier is bound to a loop by `start`, or else to the running loop of the
+    first `publish` from within a loop. Notifications published before that are
+    delivered once the consumer runs.
+
+    If a batching `window` (in seconds) is given, the notifications published within
+    the window are delivered together, keeping only the last one for each name.
+    A window of 0 collects the notifications of one loop tick.
+    '''
+
+    def __init__(self, deliver, window: float = None):
+        '''`deliver` is a coroutine function called with each notification, in order,
+        or with a list of notifications if `window` is not None'''
+        self._deliver = deliver
+        self._window = window
+        self._queue = deque()
+        self._loop = None
+        self._wakeup = None
+        self._pending = False
+
+    def start(self, loop: asyncio.AbstractEventLoop = None):
+        '''Start the consumer task on `loop`, the running loop by default'''
+        if self._loop is not None:
+            return
+        self._loop = loop if loop is not None else asyncio.get_running_loop()
+        self._loop.create_task(self._consume())
+
+    def publish(self, message):
+        self._queue.append(message)
+        if self._loop is None:
+            try:
+                self.start()
+            except RuntimeError: # no running loop in this thread
+                return
+        # the consumer drains everything queued so far each time it wakes up
+        if self._wakeup is not None and not self._pending:
+            self._pending = True
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError: # the loop has been closed
+                self._loop = None
+                self._wakeup = None
+                self._pending = False
+
+    async def _consume(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            if self._window is not None and self._queue:
+                await asyncio.sleep(self._window)
+            self._pending = False
+            if self._window is None:
+                while self._queue:
+                    message = self._queue.popleft()
+                    try:
+                        await self._deliver(message)
+                    except Exception:
+                        logger.exception(f'Failed to deliver notification {message}')
+            elif self._queue:
+                batch = {}
+                while self._queue:
+                    message = self._queue.popleft()
+                    # keep the last value of each name, in the order of the last changes
+                    batch.pop(message['name'], None)
+                    batch[message['name']] = message
+                try:
+                    await self._deliver(list(batch.values()))
+                except Exception:
+                    logger.exception(f'Failed to deliver {len(batch)} notifications')
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+
+class SessionQueue:
+    '''A bounded queue of the notifications for one web client, sent by a task of its own
+    so that a slow client does not delay the others, and never buffers without bound.
+
+    When more than `maxsize` notifications are queued, the `'drop-oldest'` policy drops the
+    oldest ones, and the `'coalesce'` policy keeps only the last notification of each name
+    (dropping the oldest names if there are still too many). Nothing is sent while the
+    transport's own backlog of packets for the client, as returned by `backlog()`, is at
+    `max_backlog` or more.
+
+    `send` is a coroutine function called with each notification in turn, or with a list
+    of all notifications queued if `batch` is True.
+    '''
+
+    POLICIES = ('drop-oldest', 'coalesce')
+
+    def __init__(self, send, maxsize: int = 1000, policy: str = 'drop-oldest', backlog=None,
+                 max_backlog: int = 8, batch: bool = False):
+        if policy not in self.POLICIES:
+            raise ValueError(f'Unknown policy `{policy}` for the queue of a web client')
+        self._send = send
+        self._maxsize = maxsize
+        self._coalesce = policy == 'coalesce'
+        self._backlog = backlog if backlog is not None else (lambda: 0)
+        self._max_backlog = max_backlog
+        self._batch = batch
+        # (time queued, notification) pairs, by name if coalescing
+        self._queue = OrderedDict() if self._coalesce else deque()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_lag = 0.
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._consume())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._queue.clear()
+
+    def put(self, message):
+        entry = (time.monotonic(), message)
+        if self._coalesce:
+            name = message['name']
+            if self._queue.pop(name, None) is not None:
+                self.coalesced += 1
+            self._queue[name] = entry
+        else:
+            self._queue.append(entry)
+        if len(self._queue) > self._maxsize:
+            if self._coalesce:
+                self._queue.popitem(last=False)
+            else:
+                self._queue.popleft()
+            if not self.dropped:
+                logger.warning('A web client is too slow to receive all notifications, dropping the oldest ones')
+            self.dropped += 1
+        self._wakeup.set()
+
+    @property
+    def lag(self) -> float:
+        '''How long (in seconds) the oldest notification still queued has been waiting'''
+        if not self._queue:
+            return 0.
+        head = next(iter(self._queue.values())) if self._coalesce else self._queue[0]
+        return time.monotonic() - head[0]
+
+    def stats(self) -> dict:
+        return {'queued': len(self._queue), 'sent': self.sent, 'dropped': self.dropped,
+                'coalesced': self.coalesced, 'lag': self.lag, 'max_lag': max(self.max_lag, self.lag),
+                'backlog': self._backlog()}
+
+    def _take(self):
+        if self._coalesce:
+            queued, message = self._queue.popitem(last=False)[1]
+        else:
+            queued, message = self._queue.popleft()
+        self.max_lag = max(self.max_lag, time.monotonic() - queued)
+        return message
+
+    async def _consume(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._queue:
+                # backpressure, let the transport catch up first
+                while self._backlog() >= self._max_backlog:
+                    await asyncio.sleep(_BACKLOG_POLL)
+                if self._batch:
+                    messages = [self._take() for _ in range(len(self._queue))]
+                else:
+                    messages = [self._take()]
+                try:
+                    await self._send(messages if self._batch else messages[0])
+                except Exception:
+                    logger.exception(f'Failed to send {len(messages)} notifications to a web client')
+                self.sent += len(messages)
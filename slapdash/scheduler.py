@@ -0,0 +1,329 @@
+'''
+A single scheduler for the `@refresh` attributes of all interfaces on an event loop
+'''
+import asyncio
+import logging
+import math
+import time
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+from .filters import fingerprint
+
+
+logger = logging.getLogger(__name__)
+
+_schedulers = weakref.WeakKeyDictionary() # loop -> RefreshScheduler
+_device_executors = weakref.WeakKeyDictionary() # interface -> single thread executor
+
+EXECUTORS = ('loop', 'thread', 'device')
+_BACKOFF = 2 # factor of the adaptive interval of an attribute after each unchanged read
+
+
+def get_scheduler(loop: asyncio.AbstractEventLoop = None) -> 'RefreshScheduler':
+    '''The refresh scheduler of `loop`, the running loop by default'''
+    if loop is None:
+        loop = asyncio.get_running_loop()
+    try:
+        return _schedulers[loop]
+    except KeyError:
+        scheduler = _schedulers[loop] = RefreshScheduler(loop)
+        return scheduler
+
+
+def check_executor(executor):
+    if executor is not None and executor not in EXECUTORS and not isinstance(executor, Executor):
+        raise ValueError(f'The executor of `@refresh` must be one of {EXECUTORS} or an Executor, not {executor}')
+
+
+def device_executor(interface) -> ThreadPoolExecutor:
+    '''The thread that reads the `@refresh` attributes of `interface` one at a time'''
+    try:
+        return _device_executors[interface]
+    except KeyError:
+        executor = _device_executors[interface] = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f'slapdash-{type(interface).__name__}')
+        return executor
+
+
+class RefreshEntry:
+    '''An attribute `attr` of `interface` to notify when it changes, read every `interval`
+    seconds, or every `interval_getter(interface)` seconds if that does not raise.
+
+    The attribute is read on the loop if `executor` is `'loop'`, in the loop's default
+    executor if it is `'thread'`, in a thread of its own for each interface if it is
+    `'device'`, or else in the given `concurrent.futures.Executor`. If `executor` is None,
+    it is taken from the attribute's `refreshExecutor` metadata, and is `'loop'` by default.
+    A read still running when the attribute is due again is not started another time.
+
+    If `min_interval` and `max_interval` are given, the interval adapts to the attribute
+    instead: it is read every `min_interval` seconds while it changes, and the interval is
+    doubled after each read that finds it unchanged, up to `max_interval` seconds.
+
+    Whether the attribute changed is decided by a hash of its contents (see
+    `slapdash.filters.fingerprint`), or, if `version_getter` is given or the attribute has
+    `versionAttr` metadata, by a version counter of the interface that changes along with
+    it, in which case the attribute itself is only read when its version changed. Either
+    way, the attribute is only serialized when it changed and someone wants its value.
+    '''
+
+    def __init__(self, interface, attr: str, interval: float, interval_getter=None, executor=None,
+                 min_interval: float = None, max_interval: float = None, version_getter=None):
+        check_executor(executor)
+        self.interface = interface
+        self.attr = attr
+        self.interval = interval if min_interval is None else min_interval
+        self.interval_getter = interval_getter
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.executor = executor
+        self.version_getter = version_getter
+        self.group = None
+        self.prev = None # the fingerprint or version of the last read
+        self.paused = False
+        self._reading = None # the future of a read in an executor
+        self._fresh = False
+        self._configured = False
+        self.skipped = 0
+        self.read_time = 0.
+        # statistics of how late the entry is read relative to its schedule
+        self.ticks = 0
+        self.lateness = 0.
+        self.max_lateness = 0.
+        self._mean = 0.
+        self._m2 = 0.
+
+    @property
+    def name(self) -> str:
+        model = getattr(self.interface, '__data_model__', None)
+        return model.parent_name + self.attr if model is not None else self.attr
+
+    def wanted(self) -> bool:
+        '''Whether anyone subscribes to the attribute (or a name containing it)'''
+        model = getattr(self.interface, '__data_model__', None)
+        return model is not None and model._root.events.wants(model.parent_name + self.attr) is not None
+
+    def tick(self, lateness: float, fresh: bool = False):
+        '''Read the attribute and notify its value if it changed, or in any case if `fresh`'''
+        self.ticks += 1
+        self.lateness = lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        delta = lateness - self._mean
+        self._mean += delta / self.ticks
+        self._m2 += delta * (lateness - self._mean)
+
+        if hasattr(self.interface, '__data_model__'):
+            model = self.interface.__data_model__
+            self._fresh = self._fresh or fresh
+            if not self._configured: # from the attribute's metadata, once its model exists
+                mdata = model.flat_props().get(self.attr, {}).get('metadata', {})
+                if self.executor is None:
+                    self.executor = mdata.get('refreshExecutor', 'loop')
+                    if self.executor not in EXECUTORS:
+                        logger.warning(f'The `refreshExecutor` metadata of `{self.name}` must be one of '
+                                       f'{EXECUTORS}, not `{self.executor}`, reading it on the loop')
+                        self.executor = 'loop'
+                if self.version_getter is None and 'versionAttr' in mdata:
+                    self.version_getter = _sibling_getter(model, self.attr, mdata['versionAttr'])
+                self._configured = True
+            if self.executor == 'loop':
+                self._publish(model, self._read(model))
+            elif self._reading is None:
+                if self.executor == 'thread':
+                    executor = None
+                elif self.executor == 'device':
+                    executor = device_executor(self.interface)
+                else:
+                    executor = self.executor
+                self._reading = asyncio.get_running_loop().run_in_executor(executor, self._read, model)
+                self._reading.add_done_callback(lambda future: self._read_done(model, future))
+            else:
+                self.skipped += 1
+
+        if self.interval_getter is not None:
+            try:
+                self.interval = self.interval_getter(self.interface)
+            except (TypeError, AttributeError):
+                pass
+
+    def stats(self) -> dict:
+        return {'interval': self.interval, 'ticks': self.ticks, 'lateness': self.lateness,
+                'mean_lateness': self._mean, 'max_lateness': self.max_lateness,
+                'jitter': math.sqrt(self._m2 / self.ticks) if self.ticks > 1 else 0.,
+                'read_time': self.read_time, 'skipped': self.skipped}
+
+    def _read(self, model):
+        '''Read the attribute if needed, and return its fingerprint or version, whether it
+        changed, the message to notify, if any, and whether it was read fresh'''
+        start = time.perf_counter()
+        try:
+            return self._check(model)
+        finally:
+            self.read_time = time.perf_counter() - start
+
+    def _check(self, model):
+        fresh = self._fresh
+        if self.version_getter is not None:
+            key = self.version_getter(self.interface)
+            if key == self.prev and not fresh:
+                return key, False, None, fresh
+        value = model[self.attr]
+        node = hasattr(value, 'serialize') # a group, list or enum of the model
+        serialized = _NOT_SERIALIZED
+        if self.version_getter is None:
+            key = fingerprint(value._interface if node else value)
+            if key is None: # an object that cannot be hashed, compare its serialization
+                key = serialized = value.serialize() if node else value
+        changed = self.prev is not None and key != self.prev
+        message = None
+        if changed or fresh:
+            name = model.parent_name + self.attr
+            wants = model._root.events.wants(name)
+            if wants:
+                if serialized is _NOT_SERIALIZED:
+                    serialized = value.serialize() if node else value
+                message = {'name': name, 'value': serialized}
+            elif wants is not None:
+                message = {'name': name}
+        return key, changed, message, fresh
+
+    def _read_done(self, model, future):
+        # back on the loop
+        self._reading = None
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error(f'Failed to refresh `{self.name}`', exc_info=future.exception())
+            return
+        self._publish(model, future.result())
+
+    def _publish(self, model, result):
+        key, changed, message, fresh = result
+        if message is not None:
+            model.emit(message)
+        if self.min_interval is not None:
+            # the scheduler moves the entry to its new interval after the tick
+            if changed:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * _BACKOFF, self.max_interval)
+        self.prev = key
+        # unless it became fresh again while it was read in an executor
+        self._fresh = self._fresh and not fresh
+
+
+_NOT_SERIALIZED = object()
+
+
+def _sibling_getter(model, attr: str, version_attr: str):
+    '''A getter of the attribute `version_attr` of the object holding `attr`, from the
+    interface of `model`'''
+    parent, _, _ = attr.rpartition('.')
+    if not parent:
+        return lambda interface: getattr(interface, version_attr)
+    return lambda interface: getattr(model[parent]._interface, version_attr)
+
+
+class _Group:
+    __slots__ = ('interval', 'entries', 'due', 'handle')
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.entries = []
+        self.due = None
+        self.handle = None
+
+
+class RefreshScheduler:
+    '''Reads the `@refresh` attributes of all interfaces on a loop, with one timer for all
+    attributes of the same interval instead of one task per attribute.
+
+    The attributes of an interval are read together at multiples of the interval on the
+    loop's clock, so that attributes of the same (or commensurate) intervals are aligned.
+    Each tick is scheduled from the time the previous one was due rather than when it ran,
+    so that delays do not accumulate, and ticks missed e.g. while the loop was blocked are
+    skipped. How late each attribute is read is recorded, see `stats`.
+
+    Attributes are not read while no one subscribes to them, or to a name containing them,
+    on the event bus of their model, and are read and notified right away when someone does.
+    '''
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._groups = {} # interval -> _Group
+        self._buses = weakref.WeakSet() # the event buses of models with paused entries
+
+    def add(self, entry: RefreshEntry):
+        group = self._groups.get(entry.interval)
+        if group is None:
+            group = self._groups[entry.interval] = _Group(entry.interval)
+            now = self._loop.time()
+            if entry.interval > 0:
+                group.due = math.floor(now / entry.interval + 1) * entry.interval
+            else:
+                group.due = now
+            group.handle = self._loop.call_at(group.due, self._fire, group)
+        group.entries.append(entry)
+        entry.group = group
+
+    def remove(self, entry: RefreshEntry):
+        group = entry.group
+        group.entries.remove(entry)
+        entry.group = None
+        if not group.entries:
+            group.handle.cancel()
+            del self._groups[group.interval]
+
+    def stats(self) -> dict:
+        '''Statistics of how late (in seconds) each attribute is read relative to its schedule,
+        by name: the last, mean and maximum lateness, and the jitter (its standard deviation)'''
+        return {entry.name: entry.stats() for group in self._groups.values() for entry in group.entries}
+
+    def _fire(self, group: _Group):
+        now = self._loop.time()
+        for entry in list(group.entries):
+            if not entry.wanted():
+                self._pause(entry)
+                continue
+            entry.paused = False
+            try:
+                # late by the reads of the entries before it as well
+                entry.tick(self._loop.time() - group.due)
+            except Exception:
+                logger.exception(f'Failed to refresh `{entry.name}`')
+            if entry.interval != group.interval: # changed by its interval getter
+                self.remove(entry)
+                self.add(entry)
+        if group.interval not in self._groups: # no entries left
+            return
+        if group.interval > 0:
+            # the next multiple of the interval after now, skipping missed ticks
+            group.due += (math.floor((now - group.due) / group.interval) + 1) * group.interval
+        else:
+            group.due = now
+        group.handle = self._loop.call_at(group.due, self._fire, group)
+
+    def _pause(self, entry: RefreshEntry):
+        entry.paused = True
+        model = getattr(entry.interface, '__data_model__', None)
+        if model is not None and model._root.events not in self._buses:
+            self._buses.add(model._root.events)
+            model._root.events._on_subscribe.append(self._subscribed)
+
+    def _subscribed(self, prefix: str):
+        # subscriptions can be made from any thread
+        try:
+            self._loop.call_soon_threadsafe(self._resume)
+        except RuntimeError: # the loop has been closed
+            pass
+
+    def _resume(self):
+        '''Read the paused entries that someone subscribed to now, without waiting for their next tick'''
+        for group in list(self._groups.values()):
+            for entry in list(group.entries):
+                if entry.paused and entry.wanted():
+                    entry.paused = False
+                    try:
+                        entry.tick(0., fresh=True)
+                    except Exception:
+                        logger.exception(f'Failed to refresh `{entry.name}`')
@@ -16,3 +16,10 @@ BASE_TYPES = {
     'float': float,
     'bool': bool
 }
+
+# numpy arrays are leaves of the model, if numpy is installed
+try:
+    import numpy
+    ARRAY_TYPES = (numpy.ndarray,)
+except ImportError:
+    ARRAY_TYPES = ()
@@ -1,10 +1,10 @@
 import re
 import os
-import inspect
 import asyncio
+import inspect
 import socketio
 import logging
-from typing import Tuple, List
+from typing import Any, Tuple, List
 
 from collections.abc import Sequence
 from functools import reduce
@@ -15,8 +15,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
+from starlette.routing import Mount
 
-from .model import Model, READONLY, BASE_TYPES
+from .model import Model, ModelList, READONLY, BASE_TYPES, parse_path, fill_path
+from .notifier import Notifier, SessionQueue
+from .events import EventBus
+from .scheduler import get_scheduler
 from .version import __version__
 
 
@@ -29,11 +33,27 @@ def web_api(
         css=None,
         enable_CORS: bool = True,
         info: dict = {},
+        client_queue_size: int = 1000,
+        client_queue_policy: str = 'drop-oldest',
         *args, **kwargs):
     '''
     Automatically generate a set of REST endpoints for a FastAPI web interface
+
+    Each socket.io session is sent the changes of the whole model, unless it emits a
+    `subscribe` event with one or more path prefixes, e.g. `laser.*` or `channels[3]`,
+    after which it is only sent the changes below the prefixes it subscribed to.
+    Prefixes can be removed again with an `unsubscribe` event.
+
+    The changes for each session are queued and sent by a task of its own, waiting for the
+    transport to catch up with slow clients. At most `client_queue_size` changes are queued
+    per session, and `client_queue_policy` decides which are dropped beyond that: the oldest
+    ones (`'drop-oldest'`), or all but the last one of each name (`'coalesce'`).
+    The state of the queues is available at the `/clients` endpoint.
     '''
 
+    if client_queue_policy not in SessionQueue.POLICIES:
+        raise ValueError(f'`client_queue_policy` must be one of {SessionQueue.POLICIES}')
+
     # the socketio ASGI app, to notify clients when params update
     if enable_CORS:
         sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
@@ -41,32 +61,138 @@ def web_api(
         sio = socketio.AsyncServer(async_mode='asgi')
     sio_app = socketio.ASGIApp(sio)
 
-    data_model_emit = data_model.emit
-
-    def emit(message):
-        data_model_emit(message)
-
-        async def _notify():
-            await sio.emit('notify', {'data': message})
-
-            # allow a user-supplied callback in the interface upon notification
-            callback = kwargs.get('web_notify_callback')
-            if callback:
-                callback_method = getattr(data_model._interface, callback)
-                callback_method(message)
-
+    def _notify_callback(message):
+        # allow a user-supplied callback in the interface upon notification
+        callback = kwargs.get('web_notify_callback')
+        if callback:
+            callback_method = getattr(data_model._interface, callback)
+            callback_method(message)
+
+    # the path prefixes each session watches, as a trie of session ids (never published to),
+    # a session watches the whole model until it subscribes to a prefix
+    watched = EventBus()
+    session_prefixes = {} # sid -> {path keys: prefix}
+    unfiltered = set() # ids of the sessions that have not subscribed yet
+    targets = {} # name -> ids of the sessions watching it, or None for all sessions
+
+    def _targets(name):
         try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                loop.create_task(_notify())
-            else:
-                loop.run_until_complete(_notify())
-        except RuntimeError:
-            # no loop yet
-            loop = asyncio.new_event_loop()
-            loop.run_until_complete(_notify())
-
-    data_model.emit = emit
+            return targets[name]
+        except KeyError:
+            sids = watched.subscribers(name)
+            targets[name] = sids = None if len(sids) == len(session_prefixes) else sids
+            return sids
+
+    # the changes still to send to each session
+    queues = {} # sid -> SessionQueue
+
+    def _enqueue(message):
+        sids = _targets(message['name'])
+        for sid in queues if sids is None else sids:
+            queue = queues.get(sid)
+            if queue is not None:
+                queue.put(message)
+
+    async def _notify(message):
+        _enqueue(message)
+        _notify_callback(message)
+
+    def _sender(sid):
+        async def send(message):
+            await sio.emit('notify', {'data': message}, room=sid)
+        return send
+
+    def _backlog(sid):
+        '''The number of packets engine.io has yet to send to a session'''
+        try: # python-socketio 5 distinguishes the ids of socket.io and engine.io sessions
+            eio_sid = sio.manager.eio_sid_from_sid(sid, '/') or sid
+        except AttributeError:
+            eio_sid = sid
+        socket = sio.eio.sockets.get(eio_sid)
+        return socket.queue.qsize() if socket is not None else 0
+
+    # notifications can come from any thread, and are delivered on the server's loop
+    notifier = Notifier(_notify)
+
+    # only subscribe to the model's notifications that someone watches, e.g. so that
+    # `@refresh` attributes are not read for nobody, once for each change
+    model_prefixes = {} # path keys -> prefix
+    if kwargs.get('web_notify_callback'):
+        data_model.events.subscribe(notifier.publish)
+
+    def _resubscribe():
+        if kwargs.get('web_notify_callback'): # subscribed to everything
+            return
+        wanted = {}
+        for prefixes in session_prefixes.values():
+            wanted.update(prefixes)
+        wanted = {keys: prefix for keys, prefix in wanted.items()
+                  if not any(other != keys and _contains_path(other, keys) for other in wanted)}
+        for keys in wanted.keys() - model_prefixes.keys():
+            data_model.events.subscribe(notifier.publish, prefix=wanted[keys])
+        for keys in model_prefixes.keys() - wanted.keys():
+            data_model.events.unsubscribe(notifier.publish, prefix=model_prefixes[keys])
+        model_prefixes.clear()
+        model_prefixes.update(wanted)
+
+    def _watch(sid, prefixes):
+        # accept `channels[3]`, `channels.3`, `laser.*` and `*`
+        for prefix in prefixes:
+            prefix = prefix.rstrip('*').rstrip('.')
+            keys = parse_path(prefix)
+            if keys not in session_prefixes[sid]:
+                watched.subscribe(sid, prefix=prefix)
+                session_prefixes[sid][keys] = prefix
+        targets.clear()
+        _resubscribe()
+
+    def _unwatch(sid, prefixes):
+        for prefix in prefixes:
+            prefix = session_prefixes[sid].pop(parse_path(prefix.rstrip('*').rstrip('.')), None)
+            if prefix is not None:
+                watched.unsubscribe(sid, prefix=prefix)
+        targets.clear()
+        _resubscribe()
+
+    @sio.event
+    async def connect(sid, environ):
+        notifier.start()
+        session_prefixes[sid] = {}
+        unfiltered.add(sid)
+        _watch(sid, [''])
+        queues[sid] = SessionQueue(_sender(sid), maxsize=client_queue_size, policy=client_queue_policy,
+                                   backlog=lambda: _backlog(sid))
+        queues[sid].start()
+
+    @sio.event
+    async def disconnect(sid):
+        if sid not in session_prefixes:
+            return
+        _unwatch(sid, list(session_prefixes[sid].values()))
+        del session_prefixes[sid]
+        unfiltered.discard(sid)
+        queues.pop(sid).stop()
+
+    @sio.event
+    async def subscribe(sid, prefixes):
+        '''Only send the changes below the given path prefix(es) to this session,
+        in addition to those of earlier subscriptions'''
+        if sid not in session_prefixes:
+            return
+        if isinstance(prefixes, str):
+            prefixes = [prefixes]
+        if sid in unfiltered: # drop the initial subscription to everything
+            unfiltered.discard(sid)
+            _unwatch(sid, [''])
+        _watch(sid, prefixes)
+
+    @sio.event
+    async def unsubscribe(sid, prefixes):
+        if sid not in session_prefixes:
+            return
+        if isinstance(prefixes, str):
+            prefixes = [prefixes]
+        _unwatch(sid, prefixes)
 
     # the REST FastAPI app
     rest_app = FastAPI()
@@ -82,7 +208,7 @@ def web_api(
 
     endpoints: List[str] = []
 
-    def add_endpoint(name):
+    def add_endpoint(name, props):
         '''automatically create an endpoint based on the property name in the data model attributes'''
         url, args = format_url(name)
         if url not in endpoints:
@@ -113,9 +239,24 @@ def web_api(
     def _info():
         return info
 
+    @rest_app.get('/clients', include_in_schema=False)
+    # pylint: disable=unused-variable
+    def _clients():
+        # the queues of the changes to send to each web client, see `SessionQueue.stats`
+        return {sid: queue.stats() for sid, queue in queues.items()}
+
+    @rest_app.get('/refresh_stats', include_in_schema=False)
+    # pylint: disable=unused-variable
+    async def _refresh_stats():
+        # how late the `@refresh` attributes are read, see `RefreshScheduler.stats`
+        return get_scheduler().stats()
+
     @rest_app.get('/get_props', include_in_schema=False)
     # pylint: disable=unused-variable
     def get_props(name: str = None):
+        if name is None and data_model._lazy:
+            # the frontend requests the complete schema
+            data_model._expand_tree()
         return data_model.props(name)
 
     @rest_app.get('/get_param', include_in_schema=False)
@@ -124,14 +265,80 @@ def web_api(
         # serializing makes sure that we get a current reading from the interface
         return data_model.serialize(data_model[name])
 
-    for name, props in data_model.flat_props().items():
-        if name in [r.path.replace(r'/', '') for r in rest_app.routes] + ['ws', 'docs']:
-            logger.warn(f'The name `{name}` is reserved for slapdash, but has been used as a parameter in the model. Unexpected results may occur.')
-        add_endpoint(name)
+    reserved_names = [r.path.replace(r'/', '') for r in rest_app.routes] + ['ws', 'docs']
+    added_names = set()
+
+    def add_endpoints():
+        for name, props in data_model.flat_props().items():
+            if name in added_names:
+                continue
+            added_names.add(name)
+            if name in reserved_names:
+                logger.warn(f'The name `{name}` is reserved for slapdash, but has been used as a parameter in the model. Unexpected results may occur.')
+            add_endpoint(name, props)
+
+            if isinstance(props['type'], list):
+                list_shape = get_shape(props['type'])
+                add_endpoint(name + ''.join(['[]' for i in range(len(list_shape))]), props)
+            elif 'shape' in props:
+                # arrays can be accessed by slices along any number of axes
+                for depth in range(1, len(props['shape']) + 1):
+                    add_endpoint(name + '[]' * depth, props)
+
+    add_endpoints()
+
+    def update_routes():
+        '''add endpoints for the attributes of the lazily explored parts of the model'''
+        add_endpoints()
+        # keep the frontend mount last for lowest routing priority
+        rest_app.router.routes.sort(key=lambda route: isinstance(route, Mount))
+        rest_app.openapi_schema = None
+
+    def on_expand(node):
+        # groups can be explored from any thread, but the routes only change on the server's loop
+        loop = notifier._loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError: # no running loop in this thread
+            running = None
+        if loop is None or loop is running or loop.is_closed():
+            update_routes()
+        else:
+            loop.call_soon_threadsafe(update_routes)
+
+    data_model._on_expand.append(on_expand)
+
+    def explore(path: str) -> bool:
+        '''Explore the groups of a lazy model along the route `path`, e.g. `/branch/simple/A_int`,
+        and return whether that added any routes'''
+        count = len(rest_app.router.routes)
+        node = data_model
+        for key in parse_path(path.strip('/').replace('/', '.'))[:-1]:
+            try:
+                node = node[key]
+            except (KeyError, IndexError, TypeError, AttributeError):
+                return False
+            if not isinstance(node, (Model, ModelList)):
+                return False
+        if isinstance(node, Model):
+            node._expand()
+            update_routes() # now, rather than on the next loop tick
+        return len(rest_app.router.routes) > count
+
+    async def explore_routes(scope, receive, send):
+        '''Serve the routes below the unexplored groups of a lazy model, which only exist
+        once the groups are explored, and pass anything else on to the frontend'''
+        path, root_path = scope['path'], scope.get('root_path', '')
+        if root_path and path.startswith(root_path + '/'): # the full path, as of starlette 0.33
+            path = path[len(root_path):]
+        if scope['type'] == 'http' and explore(path):
+            # the new routes come before this one now
+            await rest_app.router(scope, receive, send)
+        else:
+            await static_files(scope, receive, send)
 
-        if isinstance(props['type'], list):
-            list_shape = get_shape(props['type'])
-            add_endpoint(name + ''.join(['[]' for i in range(len(list_shape))]))
+    if data_model._lazy:
+        rest_app.mount('/', explore_routes)
 
     # user css to add custom stylings to the frontend
     if css is not None:
@@ -144,7 +351,8 @@ def web_api(
         parent_dir_path = os.path.dirname(os.path.realpath(__file__))
         frontend = os.path.join(parent_dir_path, 'frontend')
     # mount the front end on the root endpoint last for lowest routing priority
-    rest_app.mount('/', StaticFiles(directory=frontend, html=True))
+    static_files = StaticFiles(directory=frontend, html=True)
+    rest_app.mount('/', static_files)
 
     # the top level app
     app = FastAPI()
@@ -165,6 +373,7 @@ def web_api(
     add_exception_handlers(rest_app)
     app._rest_app = rest_app
     app._sio = sio
+    app._notifier = notifier
 
     return app
 
@@ -189,6 +398,11 @@ def format_url(name: str):
     return '/' + url.replace('.', '/'), tuple('index{}'.format(i) for i in range(indexes))
 
 
+def _contains_path(outer: tuple, inner: tuple) -> bool:
+    '''Whether the path prefix `outer` contains `inner`, as keys from `parse_path`'''
+    return len(outer) <= len(inner) and all(key is None or key == other for key, other in zip(outer, inner))
+
+
 def get_custom_openapi(app: FastAPI, name: str = None):
     def custom_openapi(*args):
         if app.openapi_schema:
@@ -217,7 +431,9 @@ def get_factory(model: Model, name: str, args: Tuple[str] = []):
         return model[name]
 
     try:
-        if isinstance(props['type'], List):
+        if 'shape' in props:
+            value_type = array_type(props, depth=(len(name) - len(prop_name)) // 2)
+        elif isinstance(props['type'], List):
             props_shape = get_shape(props['type'])
             base_type = access_deep_list(props['type'], [0 for r in range(len(props_shape))])
             value_type = nested_list_type(BASE_TYPES[base_type], depth=len(props_shape)-1)
@@ -233,15 +449,11 @@ def get_factory(model: Model, name: str, args: Tuple[str] = []):
     # except (KeyError, TypeError):
     #     value_type = str
 
+    keys = parse_path(name)
+
     def _func(**kwargs):
         if len(kwargs) > 0:
-            iname, indexes = re.subn(r'\[\d*\]', r'[index]', name)
-            for i in range(indexes):
-                iname = re.sub(
-                    r'\[index\]', '[index{}]'.format(i), iname, count=1)
-            for key, value in kwargs.items():
-                iname = iname.replace(key, str(value))
-            return model.serialize(model[iname])
+            return model.serialize(model._value_by_path(fill_path(keys, (kwargs[arg] for arg in args))))
         return model.serialize(model[name])
     _func.__name__ = name
     _func.__annotations__ = {'return': value_type}
@@ -260,7 +472,9 @@ def set_factory(model: Model, name: str, args: Tuple[str] = []):
     props = model.flat_props()[prop_name]
 
     try:
-        if isinstance(props['type'], List):
+        if 'shape' in props:
+            value_type = array_type(props, depth=(len(name) - len(prop_name)) // 2)
+        elif isinstance(props['type'], List):
             props_shape = get_shape(props['type'])
             base_type = access_deep_list(props['type'], [0 for r in range(len(props_shape))])
             if prop_name == name:
@@ -278,16 +492,13 @@ def set_factory(model: Model, name: str, args: Tuple[str] = []):
         raise AttributeError(
             'cannot create factory for {}, it is read only'.format(name))
 
+    keys = parse_path(name)
+
     def _func(value, **kwargs):
         if len(kwargs) > 0:
-            iname, indexes = re.subn(r'\[\d*\]', r'[index]', name)
-            for i in range(indexes):
-                iname = re.sub(
-                    r'\[index\]', '[index{}]'.format(i), iname, count=1)
-            for key, val in kwargs.items():
-                iname = iname.replace(key, str(val))
-            model[iname] = value
-            model_value = model[iname]
+            ikeys = fill_path(keys, (kwargs[arg] for arg in args))
+            model._value_by_path(ikeys, value)
+            model_value = model._value_by_path(ikeys)
         elif isinstance(props['type'], List):
             for index, item in enumerate(value):
                 model[f'{name}[{index}]'] = item
@@ -313,17 +524,13 @@ def set_factory(model: Model, name: str, args: Tuple[str] = []):
 
 def method_factory(model: Model, name: str, path_args: Tuple[str] = []):
 
-    def _func(**kwargs):
-        iname, indexes = re.subn(r'\[\d*\]', r'[index]', name)
-        for i in range(indexes):
-            iname = re.sub(
-                r'\[index\]', '[index{}]'.format(i), iname, count=1)
+    keys = parse_path(name)
 
-        for key in path_args:
-            iname = iname.replace(key, str(kwargs[key]))
+    def _func(**kwargs):
+        ikeys = fill_path(keys, (kwargs[key] for key in path_args))
         method_args = {key: value for key,
                        value in kwargs.items() if key not in path_args}
-        return model[iname](**method_args)
+        return model._value_by_path(ikeys)(**method_args)
 
     _func.__name__ = model[name].__name__
     _func.__annotations__ = model[name].__annotations__
@@ -385,3 +592,12 @@ def nested_list_type(base_type, depth: int=0):
         return base_type
     else:
         return nested_list_type(List[base_type], depth-1)
+
+def array_type(props: dict, depth: int=0):
+    '''the type of a numpy array slice indexed along `depth` axes, as nested lists'''
+    for prefix, base_type in (('bool', bool), ('int', int), ('uint', int), ('float', float)):
+        if props['dtype'].startswith(prefix):
+            break
+    else:
+        base_type = Any
+    return nested_list_type(base_type, depth=len(props['shape'])-depth)
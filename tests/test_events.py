@@ -0,0 +1,100 @@
+import asyncio
+import threading
+
+from slapdash import Model
+from slapdash.events import EventBus
+
+
+class Channel:
+    def __init__(self):
+        self.voltage = 0.0
+        self.enabled = False
+
+
+class Rack:
+    def __init__(self):
+        self.name = 'rack'
+        self.channels = [Channel() for _ in range(3)]
+
+
+def test_prefix_subscriptions():
+    rack = Rack()
+    model = Model(rack)
+    everything, channel, voltages, names = [], [], [], []
+    model.events.subscribe(everything.append)
+    model.events.subscribe(channel.append, prefix='channels[1]')
+    model.events.subscribe(voltages.append, prefix='channels[].voltage')
+    model.events.subscribe(names.append, prefix='channels', values=False)
+
+    rack.name = 'shelf'
+    rack.channels[1].voltage = 1.5
+    rack.channels[2].voltage = 2.5
+    rack.channels[1].enabled = True
+    assert [m['name'] for m in everything] == ['name', 'channels.1.voltage', 'channels.2.voltage',
+                                               'channels.1.enabled']
+    assert channel == [{'name': 'channels.1.voltage', 'value': 1.5}, {'name': 'channels.1.enabled', 'value': True}]
+    assert [m['name'] for m in voltages] == ['channels.1.voltage', 'channels.2.voltage']
+    assert len(names) == 3
+
+    model.events.unsubscribe(everything.append)
+    model.events.unsubscribe(channel.append, prefix='channels.1')
+    model.events.unsubscribe(voltages.append, prefix='channels[].voltage')
+    assert model.events.wants('channels.0.voltage') is False
+    assert model.events.wants('name') is None
+    rack.channels[0].voltage = 3.5
+    assert names[-1] == {'name': 'channels.0.voltage'}
+
+
+def test_handler_errors():
+    bus = EventBus()
+    delivered = []
+
+    def failing(message):
+        raise ValueError(message)
+
+    bus.subscribe(failing)
+    bus.subscribe(delivered.append)
+    bus.publish({'name': 'voltage', 'value': 1.0})
+    assert delivered == [{'name': 'voltage', 'value': 1.0}]
+
+
+def test_async_handlers():
+    delivered = []
+
+    async def handler(message):
+        delivered.append((message, threading.get_ident()))
+
+    async def main():
+        bus = EventBus()
+        bus.subscribe(handler, prefix='voltage')
+        thread = threading.Thread(target=bus.publish, args=({'name': 'voltage', 'value': 1.0},))
+        thread.start()
+        thread.join()
+        for _ in range(100):
+            if delivered:
+                break
+            await asyncio.sleep(0.01)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert delivered == [({'name': 'voltage', 'value': 1.0}, loop_thread)]
+
+
+def test_async_handlers_before_loop():
+    delivered = []
+
+    async def handler(message):
+        delivered.append(message)
+
+    # as `run()` does for its add-in servers, which may subscribe before the loop runs
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        bus = EventBus()
+        bus.subscribe(handler)
+        bus.publish({'name': 'voltage', 'value': 1.0})
+        loop.run_until_complete(asyncio.sleep(0.01))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+    assert delivered == [{'name': 'voltage', 'value': 1.0}]
@@ -1,3 +1,7 @@
+import asyncio
+import threading
+import time
+
 import slapdash
 
 metadata = dict(min=0., max=1., step=0.1)
@@ -110,5 +114,154 @@ def test_function_wrapping():
     assert model.props()['s']['doc'] == 'This subclass has a docstring.'
 
 
+class Channels:
+    def __init__(self):
+        self.channels = [Simple() for i in range(3)]
+
+
+def test_shared_schema():
+    interface = Channels()
+    model = slapdash.Model(interface)
+    first, second = model.props()['channels']['type'][:2]
+    assert first['a']['metadata'] == metadata
+    assert first['a']['metadata'] is second['a']['metadata']
+    assert first['b']['args'] is second['b']['args']
+    assert first['a']['index'] != second['a']['index']
+
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+        self.free = 0
+        self.samples = []
+        self._metadata = {'count': {'maxRate': 20}}
+
+
+def test_max_rate():
+    counter = Counter()
+    model = slapdash.Model(counter)
+    messages = []
+    model.events.subscribe(messages.append)
+    for i in range(1, 101):
+        counter.count = i
+        counter.free = i
+    assert counter.count == 100
+    assert [m['value'] for m in messages if m['name'] == 'count'] == [1]
+    assert len([m for m in messages if m['name'] == 'free']) == 100
+    time.sleep(0.2) # the last value is delivered after the interval
+    assert [m['value'] for m in messages if m['name'] == 'count'] == [1, 100]
+
+
+def test_max_rate_after_loop():
+    counter = Counter()
+    model = slapdash.Model(counter)
+    messages = []
+    model.events.subscribe(messages.append)
+    threads = threading.active_count()
+
+    async def drive():
+        for i in range(1, 101):
+            counter.count = i
+
+    asyncio.run(drive()) # e.g. a driver, whose loop stops before the last value is delivered
+    time.sleep(0.2)
+    assert [m['value'] for m in messages if m['name'] == 'count'] == [1, 100]
+    counter.count = 101
+    assert [m['value'] for m in messages if m['name'] == 'count'] == [1, 100, 101]
+    assert threading.active_count() <= threads + 1 # a single timer thread
+
+
+def test_instance_metadata_not_cached():
+    from slapdash.model import _METADATA_CACHE
+    for i in range(1000):
+        slapdash.Model(Counter())
+    assert Counter not in _METADATA_CACHE
+    model = slapdash.Model(Simple())
+    assert model.props()['a']['metadata'] is slapdash.Model(Simple()).props()['a']['metadata']
+
+
+def test_max_rate_schema_change():
+    counter = Counter()
+    model = slapdash.Model(counter)
+    messages = []
+    model.events.subscribe(messages.append)
+    for i in range(1, 6):
+        counter.count = i
+        counter.samples = [0.0] * i # rebuilds the schema, but keeps the throttle
+    assert [m['value'] for m in messages if m['name'] == 'count'] == [1]
+    time.sleep(0.2)
+    assert [m['value'] for m in messages if m['name'] == 'count'] == [1, 5]
+
+
+class Readback:
+    def __init__(self):
+        self.temperature = 20.0
+        self.photodiodes = [1.0, 2.0]
+        self.labels = []
+        self._metadata = {
+            'temperature': {'deadband': 0.1},
+            'photodiodes': {'deadband': 0.01, 'deadbandMode': 'relative'},
+        }
+
+
+def test_deadband():
+    readback = Readback()
+    model = slapdash.Model(readback)
+    messages = []
+    model.events.subscribe(messages.append)
+    for value in (20.0, 20.05, 20.12, 20.15, 20.0):
+        readback.temperature = value
+    assert [m['value'] for m in messages] == [20.0, 20.12, 20.0]
+
+    messages.clear()
+    readback.photodiodes[1] = 2.01 # element-wise, relative to the last value
+    readback.photodiodes[1] = 2.015
+    readback.photodiodes[1] = 2.04
+    model['photodiodes'] = [1.005, 2.04]
+    model['photodiodes'] = [1.02, 2.04]
+    assert [m['value'] for m in messages] == [2.01, 2.04, 1.005, 1.02]
+
+    messages.clear()
+    for i, value in enumerate((1.021, 1.022, 1.023)):
+        readback.photodiodes = [value, 2.04]
+        readback.labels = ['pd'] * i # rebuilds the schema, but keeps the deadband
+    assert [m['value'] for m in messages if m['name'] == 'photodiodes'] == [[1.021, 2.04]]
+
+
+class Poller:
+    def __init__(self):
+        self.status = 'idle'
+        self.wave = [0.0, 1.0, 2.0]
+        self.counts = 0
+        self._metadata = {'counts': {'suppressUnchanged': False}}
+
+
+def test_suppress_unchanged():
+    poller = Poller()
+    model = slapdash.Model(poller, suppress_unchanged=True)
+    messages = []
+    model.events.subscribe(messages.append)
+    for _ in range(3): # a driver reassigning its state after each poll
+        poller.status = 'busy'
+        poller.wave = [0.0, 1.0, 2.0]
+        poller.counts = 5
+    assert [m['name'] for m in messages] == ['status', 'wave', 'counts', 'counts', 'counts']
+
+    messages.clear()
+    poller.wave[1] = 1.5 # the fingerprints of the list and its items are forgotten
+    poller.wave = [0.0, 1.0, 2.0]
+    poller.wave[1] = 1.0
+    poller.wave[1] = 1.0
+    poller.status = 1 # a value of another type
+    assert messages == [{'name': 'wave.1', 'value': 1.5}, {'name': 'wave', 'value': [0.0, 1.0, 2.0]},
+                        {'name': 'wave.1', 'value': 1.0}, {'name': 'status', 'value': 1}]
+
+    messages.clear()
+    # values of equal hashes or of equal items of other types are still changes
+    for wave in ([-2, 5], [-1, 5], [-2, 5], [1], [1.0], [True]):
+        poller.wave = wave
+    assert [m['value'] for m in messages] == [[-2, 5], [-1, 5], [-2, 5], [1], [1.0], [True]]
+
 if __name__ == '__main__':
-    test_function_wrapping()
\ No newline at end of file
+    test_function_wrapping()
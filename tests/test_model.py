@@ -1,4 +1,10 @@
+import asyncio
+from enum import Enum
+
+import pytest
+import slapdash
 from slapdash import Model
+from slapdash.model import parse_path, fill_path
 
 
 class Simple:
@@ -216,3 +222,349 @@ def test_nesting():
     assert nested_array.array3d2[0][0][1] == 0.04
     assert nested_array.subclass_permanent.subclass_array1d_permanent[1] == 0.05
     assert nested_array.subclass_permanent.subclass_array2d_permanent[0][2] == 0.06
+
+
+def test_child_cache():
+    tree = Tree()
+    model = Model(tree)
+
+    assert model['branch'] is model['branch']
+    assert model['branch.simple'] is model['branch']['simple']
+
+    old_simple = model['simple']
+    tree.simple = Simple()
+    tree.simple.A_int = 5
+    assert model['simple'] is not old_simple
+    assert model['simple.A_int'] == 5
+    assert model['simple'] is model['simple']
+
+    nested_array = HeavilyNested()
+    model = Model(nested_array)
+    assert model['array2d_permanent'][0] is model['array2d_permanent'][0]
+
+
+def test_paths():
+    assert parse_path('channels[3].voltage') == ('channels', 3, 'voltage')
+    assert parse_path('channels.3.voltage') == ('channels', 3, 'voltage')
+    assert parse_path('array[][]') == ('array', None, None)
+    assert fill_path(parse_path('array[0][]'), [1, 2]) == ('array', 1, 2)
+
+    nested_array = HeavilyNested()
+    model = Model(nested_array)
+    assert model['list_of_subclasses[1].subclass_array1d_on_init'].serialize() == nested_array.list_of_subclasses[1].subclass_array1d_on_init
+    # the names of the schema are parsed once, when the model is built
+    assert model._paths['list_of_subclasses[1].subclass_array1d_on_init'] == ('list_of_subclasses', 1, 'subclass_array1d_on_init')
+    assert set(model._paths) == set(model.flat_props())
+    model._value_by_path(('array3d2', 0, 0, 1), 3.5)
+    assert nested_array.array3d2[0][0][1] == 3.5
+    assert model._value_by_path(('array3d2', 0, 0, 1)) == 3.5
+
+
+
+def test_nested_list_views():
+    nested_array = HeavilyNested()
+    model = Model(nested_array)
+    row = model['array2d_on_init'][1]
+    # the model shares the storage of the (wrapped) nested lists
+    assert row._interface is nested_array.array2d_on_init[1]
+
+    messages = []
+    model.events.subscribe(messages.append)
+    row[2] = 4.5
+    assert nested_array.array2d_on_init[1][2] == 4.5
+    nested_array.array2d_on_init[1][0] = 5.5
+    assert model['array2d_on_init'][1][0] == 5.5
+    assert messages == [{'name': 'array2d_on_init.1.2', 'value': 4.5},
+                        {'name': 'array2d_on_init.1.0', 'value': 5.5}]
+
+class Rebound:
+    def __init__(self):
+        self.simple = Simple()
+        self.subclasses = [Subclass(), Subclass()]
+        self._count = 2
+
+    @property
+    def readings(self):
+        return [0.5] * self._count
+
+
+def test_flat_props():
+    rebound = Rebound()
+    model = Model(rebound)
+
+    flat_props = model.flat_props()
+    assert list(flat_props) == [
+        'simple.A_int', 'simple.B_float', 'simple.C_bool', 'simple.D_str', 'simple',
+        'subclasses[0].subclass_array1d_on_init', 'subclasses[0].subclass_array2d_on_init',
+        'subclasses[0].subclass_array1d_permanent', 'subclasses[0].subclass_array2d_permanent',
+        'subclasses[1].subclass_array1d_on_init', 'subclasses[1].subclass_array2d_on_init',
+        'subclasses[1].subclass_array1d_permanent', 'subclasses[1].subclass_array2d_permanent',
+        'subclasses', 'readings']
+    assert model.flat_props() is flat_props
+
+    # a new list of the same structure on each read leaves the schema alone
+    assert model['readings'].serialize() == [0.5, 0.5]
+    assert model.flat_props() is flat_props
+    rebound._count = 3
+    assert model['readings'].serialize() == [0.5, 0.5, 0.5]
+    assert model.flat_props() is not flat_props
+    assert model.props()['readings']['type'] == ['float'] * 3
+
+    rebound.simple = Branch()
+    assert model['simple.simple.A_int'] == 0
+    assert 'simple.simple.A_int' in model.flat_props()
+    assert 'simple.A_int' not in model.flat_props()
+
+
+class Leaf:
+    def __init__(self):
+        self.a = 1
+        self.b = 2.0
+
+
+class Fork:
+    def __init__(self):
+        self.sub = Leaf()
+
+
+class Grove:
+    def __init__(self):
+        self.fork = Fork()
+        self.later = Leaf()
+
+    @property
+    def fresh(self):
+        return Leaf()
+
+
+def test_rebound_indexes():
+    grove = Grove()
+    model = Model(grove)
+    indexes = {name: prop['index'] for name, prop in model.flat_props().items()}
+
+    # a new object of the same structure keeps the schema and its indexes
+    flat_props = model.flat_props()
+    model['fresh']
+    model['fresh']
+    assert model.flat_props() is flat_props
+    grove.fork.sub = Leaf()
+    assert model['fork.sub.a'] == 1
+    assert model.props('fork')['sub']['type']['a']['index'] == indexes['fork.sub.a']
+
+    # the props of a new structure are numbered after all others
+    grove.fork.sub = Fork()
+    assert model['fork.sub.sub.a'] == 1
+    flat_indexes = [prop['index'] for prop in model.flat_props().values()]
+    assert len(set(flat_indexes)) == len(flat_indexes)
+    assert model._lookup(indexes['later.a']) == 'later.a'
+    assert model._lookup(model.flat_props()['fork.sub.sub.b']['index']) == 'fork.sub.sub.b'
+
+
+def test_lazy():
+    tree = Tree()
+    model = Model(tree, lazy=True)
+
+    assert model.props()['branch']['type'] == {}
+    assert 'branch.simple.A_int' not in model.flat_props()
+
+    assert model['branch.simple.A_int'] == 0
+    assert model.props()['branch']['type']['simple']['type']['A_int']['type'] == 'int'
+    assert 'branch.simple.A_int' in model.flat_props()
+    assert model.props('simple')['B_float']['type'] == 'float'
+
+    tree.branch.simple.A_int = 3
+    assert model['branch.simple.A_int'] == 3
+    assert model.serialize(model['simple']) == {
+        'A_int': 0, 'B_float': 1.5, 'C_bool': False, 'D_str': 'test'}
+
+
+class Mode(Enum):
+    DC = 'DC'
+    AC = 'AC'
+
+
+class Instrument:
+    def __init__(self):
+        self._reads = []
+
+    @property
+    def voltage(self) -> float:
+        self._reads.append('voltage')
+        return 1.5
+
+    @property
+    def mode(self) -> Mode:
+        self._reads.append('mode')
+        return Mode.AC
+
+    @property
+    def serial(self):
+        self._reads.append('serial')
+        return 'X1'
+
+
+def test_static_types():
+    instrument = Instrument()
+    model = Model(instrument)
+    assert sorted(instrument._reads) == ['mode', 'serial', 'voltage']
+
+    instrument = Instrument()
+    model = Model(instrument, static_types=True)
+    assert instrument._reads == ['serial']
+    assert model.props()['voltage']['type'] == 'float'
+    assert model.props()['voltage']['readonly']
+    assert model.props()['mode']['type'] == 'enum'
+    assert model.props()['mode']['enums'] == ['DC', 'AC']
+    assert model.props()['serial']['type'] == 'str'
+    assert model.serialize() == {'voltage': 1.5, 'mode': 'AC', 'serial': 'X1'}
+
+
+def test_compact_nodes():
+    instrument = Instrument()
+    model = Model(instrument)
+    nested_array = HeavilyNested()
+    nested_model = Model(nested_array)
+    for node in (model, model['mode'], nested_model['array2d_permanent']):
+        assert not hasattr(node, '__dict__')
+    # enum lookup tables are shared by all nodes of an Enum class
+    assert model['mode']._value_map is Model(Instrument())['mode']._value_map
+
+    messages = []
+    nested_model['array2d_permanent'][0][1] = 7
+    assert messages == []
+    nested_model.events.subscribe(messages.append)
+    nested_model['array2d_permanent'][0][1] = 7
+    assert messages == [{'name': 'array2d_permanent.0.1', 'value': 7}]
+
+
+def test_numpy_arrays():
+    np = pytest.importorskip('numpy')
+
+    class Camera:
+        def __init__(self):
+            self.spectrum = np.zeros(1000)
+            self.image = np.zeros((2, 3), dtype=np.uint8)
+
+    camera = Camera()
+    model = Model(camera)
+    assert model.props()['image'] == {'name': 'image', 'type': 'array', 'index': 1, 'dtype': 'uint8', 'shape': [2, 3]}
+    assert model.serialize()['spectrum'] == [0.0] * 1000
+
+    messages = []
+    model.events.subscribe(messages.append)
+    image = camera.image
+    model['image[1]'] = [1, 2, 3]
+    model['image[0][2]'] = 4
+    assert camera.image is image
+    assert model['image[1][2]'] == 3
+    assert model.serialize(model['image']) == [[0, 0, 4], [1, 2, 3]]
+    assert messages == [{'name': 'image.1', 'value': [1, 2, 3]}, {'name': 'image.0.2', 'value': 4}]
+
+    camera.image = np.ones((4, 4))
+    model['image']
+    assert model.props()['image']['shape'] == [4, 4]
+
+
+def test_serialize_lists():
+    class Lists:
+        def __init__(self):
+            self.numbers = [1, 2.5, True, 'x']
+            self.nested = [[1.5, 2.5], [3.5, 4.5]]
+            self.mixed = [[1.5, 2.5], Simple()]
+
+    lists = Lists()
+    model = Model(lists)
+    serialized = model.serialize()
+    assert serialized['numbers'] == [1, 2.5, True, 'x']
+    assert serialized['nested'] == [[1.5, 2.5], [3.5, 4.5]]
+    assert serialized['mixed'] == [[1.5, 2.5], {'A_int': 0, 'B_float': 1.5, 'C_bool': False, 'D_str': 'test'}]
+    # a copy, not the list itself
+    assert serialized['nested'][0] is not lists.nested[0]
+
+
+class Readout:
+    def __init__(self):
+        self._reads = 0
+        self._value = 0.0
+
+    @property
+    def value(self):
+        self._reads += 1
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+
+
+def test_notify_listeners():
+    readout = Readout()
+    model = Model(readout)
+    readout._reads = 0
+
+    readout.value = 1.0 # no one listens, nothing is serialized
+    assert readout._reads == 0
+
+    names = []
+    model.events.subscribe(names.append, values=False)
+    readout.value = 2.0
+    assert readout._reads == 0
+    assert names == [{'name': 'value'}]
+
+    messages = []
+    model.events.subscribe(messages.append)
+    readout.value = 3.0
+    assert readout._reads == 1
+    assert messages == [{'name': 'value', 'value': 3.0}]
+    assert names[-1] is messages[-1]
+
+
+def test_batch():
+    readout = Readout()
+    model = Model(readout)
+    readout._reads = 0
+    messages = []
+    model.events.subscribe(messages.append)
+
+    with slapdash.batch(readout):
+        readout.value = 1.0
+        with slapdash.batch(readout):
+            readout.value = 2.0
+        readout.value = 3.0
+        assert messages == []
+    assert messages == [{'name': 'value', 'value': 3.0}]
+    assert readout._reads == 1
+
+    async def main():
+        release = asyncio.Event()
+
+        async def other_task():
+            await release.wait()
+            readout.value = 4.0
+
+        task = asyncio.create_task(other_task())
+        with slapdash.batch(readout):
+            readout.value = 5.0
+            # changes of other tasks are not deferred
+            release.set()
+            await task
+            assert messages[1:] == [{'name': 'value', 'value': 4.0}]
+        # the deferred change is notified with the final value
+        assert messages[2:] == [{'name': 'value', 'value': 4.0}]
+
+    asyncio.run(main())
+
+
+class Setup:
+    def __init__(self):
+        with slapdash.batch(self): # before the interface has a model
+            self.amplitude = 1.0
+            self.frequency = 1e3
+
+
+def test_batch_without_model():
+    setup = Setup()
+    with slapdash.batch(setup):
+        setup.amplitude = 2.0
+    model = Model(setup)
+    assert model['amplitude'] == 2.0
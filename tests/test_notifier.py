@@ -0,0 +1,123 @@
+import asyncio
+import threading
+
+from slapdash.notifier import Notifier, SessionQueue
+
+
+def test_notifier_threads():
+    delivered = []
+
+    async def deliver(message):
+        delivered.append((message, threading.get_ident()))
+
+    notifier = Notifier(deliver)
+    notifier.publish(0) # before the consumer runs
+
+    def publisher():
+        for i in range(1, 1001):
+            notifier.publish(i)
+
+    async def main():
+        notifier.start()
+        thread = threading.Thread(target=publisher)
+        thread.start()
+        for _ in range(500):
+            if len(delivered) == 1001:
+                break
+            await asyncio.sleep(0.01)
+        thread.join()
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert [message for message, thread in delivered] == list(range(1001))
+    assert all(thread == loop_thread for message, thread in delivered)
+
+
+def test_notifier_batch():
+    batches = []
+
+    async def deliver(messages):
+        batches.append(messages)
+
+    notifier = Notifier(deliver, window=0.05)
+
+    async def main():
+        notifier.start()
+        await asyncio.sleep(0)
+        for i in range(100):
+            notifier.publish({'name': 'a', 'value': i})
+            notifier.publish({'name': f'b.{i % 2}', 'value': i})
+        await asyncio.sleep(0.2)
+        notifier.publish({'name': 'a', 'value': 100})
+        await asyncio.sleep(0.2)
+
+    asyncio.run(main())
+    assert batches == [
+        [{'name': 'b.0', 'value': 98}, {'name': 'a', 'value': 99}, {'name': 'b.1', 'value': 99}],
+        [{'name': 'a', 'value': 100}]]
+
+
+def test_session_queues():
+    sent = {'fast': [], 'slow': [], 'coalesce': []}
+    backlog = {'fast': 0, 'slow': 100, 'coalesce': 100} # packets the transport has yet to send
+
+    def sender(name):
+        async def send(message):
+            sent[name].append(message['value'])
+        return send
+
+    async def main():
+        queues = {
+            'fast': SessionQueue(sender('fast'), maxsize=10, backlog=lambda: backlog['fast']),
+            'slow': SessionQueue(sender('slow'), maxsize=10, backlog=lambda: backlog['slow']),
+            'coalesce': SessionQueue(sender('coalesce'), maxsize=10, policy='coalesce',
+                                     backlog=lambda: backlog['coalesce']),
+        }
+        for queue in queues.values():
+            queue.start()
+        for i in range(100):
+            for queue in queues.values():
+                queue.put({'name': f'channel{i % 3}', 'value': i})
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        # slow clients do not hold up fast ones, and queue a bounded number of changes
+        assert sent['fast'] == list(range(100))
+        assert sent['slow'] == sent['coalesce'] == []
+        assert queues['slow'].stats()['queued'] == 10 and queues['slow'].dropped == 90
+        assert queues['slow'].lag > 0.04
+        backlog['slow'] = backlog['coalesce'] = 0
+        await asyncio.sleep(0.05)
+        for queue in queues.values():
+            queue.stop()
+        return queues
+
+    queues = asyncio.run(main())
+    assert sent['slow'] == list(range(90, 100))
+    assert sent['coalesce'] == [97, 98, 99] # the last value of each name
+    assert queues['coalesce'].coalesced == 97
+    assert queues['slow'].stats()['max_lag'] > 0.04
+
+
+def test_session_queue_lag():
+    sent = []
+    backlog = [100]
+
+    async def send(message):
+        sent.append(message['value'])
+        backlog[0] = 100 # the transport is busy again
+
+    async def main():
+        queue = SessionQueue(send, backlog=lambda: backlog[0])
+        queue.start()
+        queue.put({'name': 'a', 'value': 1})
+        await asyncio.sleep(0.1)
+        queue.put({'name': 'a', 'value': 2})
+        backlog[0] = 0
+        while not sent:
+            await asyncio.sleep(0.001)
+        # the queue never ran empty, but its oldest notification is a recent one
+        assert queue.lag < 0.05
+        assert queue.max_lag >= 0.1
+        queue.stop()
+
+    asyncio.run(main())
@@ -7,6 +7,8 @@
 import pytest
 import json
 from enum import Enum
+import slapdash
+from slapdash import Model
 from slapdash.decorators import Saver
 
 
@@ -118,3 +120,38 @@ def test_saver_bad_settings(tmp_path):
     }
     with pytest.raises(TypeError, match='Cannot override class parameter'):
         make_dashboard_with_saver(tmp_path, bad_settings)
+
+
+def test_saver_batch(tmp_path):
+    dashboard = make_dashboard_with_saver(tmp_path, {'a_float': 1.0, 'a_int': 1, 'array_int': [1, 2, 3, 4]})
+    model = Model(dashboard)
+    model.events.subscribe(dashboard._trigger_save, values=False)
+    writes = []
+
+    def write_settings():
+        writes.append(dict(dashboard._settings))
+        type(dashboard)._write_settings(dashboard)
+
+    dashboard._write_settings = write_settings
+    with slapdash.batch(dashboard):
+        dashboard.a_float = 2.0
+        dashboard.a_int = 2
+        dashboard.array_int[1] = 5
+        dashboard.a_float = 3.0
+    assert len(writes) == 1
+    with open(tmp_path / 's.json') as f:
+        assert json.load(f) == {'a_float': 3.0, 'a_int': 2, 'array_int': [1, 5, 3, 4]}
+
+
+def test_saver_reassigned(tmp_path):
+    dashboard = make_dashboard_with_saver(tmp_path, {'array_int': [1, 2, 3, 4], 'sub': {'value': 1.0}})
+    model = Model(dashboard)
+    model.events.subscribe(dashboard._trigger_save, values=False)
+    dashboard.array_int = [5, 6, 7, 8]
+    dashboard.array_int[0] = 9
+    dashboard.sub = Sub()
+    dashboard.sub.value = 2.0
+    with open(tmp_path / 's.json') as f:
+        settings = json.load(f)
+    assert settings['array_int'] == [9, 6, 7, 8]
+    assert settings['sub'] == {'value': 2.0}
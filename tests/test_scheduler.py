@@ -0,0 +1,268 @@
+import asyncio
+import threading
+import time
+
+import slapdash
+from slapdash import Model
+from slapdash.scheduler import get_scheduler
+
+
+@slapdash.refresh('reading', 0.05)
+class Sensor:
+    def __init__(self):
+        self._reads = 0
+        self.interval = 0.05
+
+    @property
+    def reading(self):
+        self._reads += 1
+        return self._reads
+
+
+@slapdash.refresh('reading', 0.05, delay_attr='interval')
+class SlowSensor(Sensor):
+    pass
+
+
+def test_refresh_scheduler():
+    async def main():
+        loop = asyncio.get_running_loop()
+        sensors = [Sensor() for _ in range(20)]
+        models = [Model(sensor) for sensor in sensors]
+        messages = []
+        for model in models:
+            model.events.subscribe(messages.append)
+        slow = SlowSensor()
+        slow.interval = 0.1
+        Model(slow).events.subscribe(messages.append)
+        await asyncio.sleep(0)
+        scheduler = get_scheduler()
+        # one timer for all attributes of the same interval
+        assert len(scheduler._groups) == 1 and len(scheduler._groups[0.05].entries) == 22
+
+        start = loop.time()
+        await asyncio.sleep(0.3)
+        ticks = (loop.time() - start) / 0.05
+        assert all(abs(sensor._reads - ticks) <= 3 for sensor in sensors)
+        assert len(messages) >= 20 * (ticks - 3)
+        assert set(scheduler._groups) == {0.05, 0.1} # the slow sensor moved to its own interval
+        stats = scheduler.stats()['reading']
+        assert stats['ticks'] > 0 and stats['max_lateness'] >= stats['mean_lateness'] >= 0
+
+    asyncio.run(main())
+
+
+@slapdash.refresh('first', 0.05)
+@slapdash.refresh('second', 0.05)
+@slapdash.refresh('third', 0.05)
+class Bench:
+    def _read(self):
+        time.sleep(0.01) # blocks the loop
+        return 0.
+
+    first = property(_read)
+    second = property(_read)
+    third = property(_read)
+
+
+def test_refresh_lateness():
+    async def main():
+        model = Model(Bench())
+        model.events.subscribe(lambda message: None)
+        await asyncio.sleep(0.3)
+        stats = get_scheduler().stats()
+        lateness = sorted(stats[name]['mean_lateness'] for name in ('first', 'second', 'third'))
+        # each attribute is late by the reads of those before it in its tick
+        assert lateness[1] - lateness[0] >= 0.008 and lateness[2] - lateness[1] >= 0.008
+
+    asyncio.run(main())
+
+
+def test_refresh_on_demand():
+    async def main():
+        loop = asyncio.get_running_loop()
+        sensor = Sensor()
+        model = Model(sensor)
+        sensor._reads = 0
+        await asyncio.sleep(0.2)
+        assert sensor._reads == 0 # no one listens
+
+        messages = []
+        model.events.subscribe(messages.append, prefix='interval')
+        await asyncio.sleep(0.1)
+        assert sensor._reads == 0
+        model.events.subscribe(messages.append, prefix='reading')
+        start = loop.time()
+        while not messages: # read right away, well before the next tick
+            await asyncio.sleep(0)
+        assert messages == [{'name': 'reading', 'value': 1}] and loop.time() - start < 0.05
+        await asyncio.sleep(0.1)
+        assert sensor._reads > 1
+
+        model.events.unsubscribe(messages.append, prefix='reading')
+        await asyncio.sleep(0.06)
+        reads = sensor._reads
+        await asyncio.sleep(0.1)
+        assert sensor._reads == reads
+
+    asyncio.run(main())
+
+
+@slapdash.refresh('temperature', 0.05, executor='device')
+@slapdash.refresh('pressure', 0.05)
+class Gauge:
+    def __init__(self):
+        self._threads = set()
+        self._reads = 0
+        self._metadata = {'pressure': {'refreshExecutor': 'device'}}
+
+    def _read(self):
+        time.sleep(0.1) # a slow serial read
+        self._threads.add(threading.get_ident())
+        self._reads += 1
+        return self._reads
+
+    @property
+    def temperature(self):
+        return self._read()
+
+    @property
+    def pressure(self):
+        return self._read()
+
+
+def test_refresh_executor():
+    async def main():
+        loop = asyncio.get_running_loop()
+        gauge = Gauge()
+        model = Model(gauge)
+        messages = []
+        model.events.subscribe(messages.append)
+        gauge._threads.clear()
+
+        # the loop keeps running on time while the gauge is read
+        stalls = []
+        for _ in range(60):
+            start = loop.time()
+            await asyncio.sleep(0.01)
+            stalls.append(loop.time() - start - 0.01)
+        assert max(stalls) < 0.08 # a read on the loop would stall it for 0.1 s
+        assert {m['name'] for m in messages} == {'temperature', 'pressure'}
+        # both attributes are read one at a time by the gauge's own thread
+        assert len(gauge._threads) == 1 and threading.get_ident() not in gauge._threads
+        stats = get_scheduler().stats()['temperature']
+        assert stats['read_time'] >= 0.1 and stats['skipped'] > 0
+
+    asyncio.run(main())
+
+
+@slapdash.refresh('current', 0.01)
+class Meter:
+    def __init__(self):
+        self._metadata = {'current': {'refreshExecutor': 'threads'}} # a typo
+        self._reads = 0
+
+    @property
+    def current(self):
+        self._reads += 1
+        return self._reads
+
+
+def test_refresh_executor_metadata(caplog):
+    async def main():
+        meter = Meter()
+        model = Model(meter)
+        messages = []
+        model.events.subscribe(messages.append)
+        await asyncio.sleep(0.1)
+        # read on the loop instead, with a single warning
+        assert len(messages) > 1
+        assert len([r for r in caplog.records if 'refreshExecutor' in r.getMessage()]) == 1
+
+    asyncio.run(main())
+
+
+@slapdash.refresh('output', min_delay=0.01, max_delay=0.08)
+class Supply:
+    def __init__(self):
+        self.target = 0.
+        self._output = 0.
+
+    @property
+    def output(self):
+        # ramps towards the target in steps
+        self._output = min(self._output + 1., self.target)
+        return self._output
+
+
+def test_adaptive_refresh():
+    async def main():
+        supply = Supply()
+        model = Model(supply)
+        messages = []
+        model.events.subscribe(messages.append, prefix='output')
+        await asyncio.sleep(0.4)
+        scheduler = get_scheduler()
+        assert scheduler.stats()['output']['interval'] == 0.08 # stable, backed off
+
+        supply.target = 5.
+        while not messages:
+            await asyncio.sleep(0.001)
+        assert scheduler.stats()['output']['interval'] == 0.01 # changing
+        await asyncio.sleep(0.4)
+        assert [m['value'] for m in messages] == [1., 2., 3., 4., 5.]
+        assert scheduler.stats()['output']['interval'] == 0.08
+
+    asyncio.run(main())
+
+
+@slapdash.refresh('trace', delay=0.01, version_attr='_version')
+@slapdash.refresh('frame', delay=0.01)
+class Scope:
+    def __init__(self):
+        self._frame = [0, 0, 0, 0]
+        self._version = 0
+        self._reads = 0
+
+    @property
+    def trace(self):
+        self._reads += 1
+        return (list(range(4)), [self._version] * 4)
+
+    @property
+    def frame(self):
+        return self._frame
+
+
+def test_refresh_change_detection():
+    async def main():
+        scope = Scope()
+        model = Model(scope)
+        scope._reads = 0 # by the model's schema
+        messages = []
+        model.events.subscribe(messages.append)
+        await asyncio.sleep(0.1)
+        assert messages == []
+        assert scope._reads == 1 # only read again when its version changes
+
+        scope._version += 1
+        await asyncio.sleep(0.1)
+        assert messages == [{'name': 'trace', 'value': [[0, 1, 2, 3], [1, 1, 1, 1]]}]
+        assert scope._reads == 2
+
+        # changed in place behind the model's back, detected by its contents
+        messages.clear()
+        scope._frame[2] = 1
+        await asyncio.sleep(0.1)
+        assert [m['name'] for m in messages] == ['frame']
+        assert list(messages[0]['value']) == [0, 0, 1, 0]
+
+        # contents of equal hashes, e.g. hash(-1) == hash(-2)
+        messages.clear()
+        scope._frame[0] = -1
+        await asyncio.sleep(0.1)
+        scope._frame[0] = -2
+        await asyncio.sleep(0.1)
+        assert [list(m['value']) for m in messages] == [[-1, 0, 1, 0], [-2, 0, 1, 0]]
+
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+from starlette.routing import Mount
+
+from slapdash import Model
+from slapdash.web import web_api
+
+
+class Laser:
+    def __init__(self):
+        self.power = 0.0
+        self.wavelength = 780.0
+
+
+class Channel:
+    def __init__(self):
+        self.voltage = 0.0
+
+
+class Lab:
+    def __init__(self):
+        self.laser = Laser()
+        self.channels = [Channel() for _ in range(4)]
+
+
+def test_session_subscriptions(monkeypatch):
+    lab = Lab()
+    app = web_api(Model(lab))
+    sio = app._sio
+    sent = []
+
+    async def emit(event, data=None, room=None, **kwargs):
+        sent.append((room, data['data']['name']))
+
+    monkeypatch.setattr(sio, 'emit', emit)
+    handlers = sio.handlers['/']
+
+    async def main():
+        app._notifier.start()
+        for sid in ('all', 'laser', 'channel'):
+            await handlers['connect'](sid, {})
+        lab.laser.power = 0.5
+        await asyncio.sleep(0.05)
+        assert sorted(sent) == [('all', 'laser.power'), ('channel', 'laser.power'), ('laser', 'laser.power')]
+
+        sent.clear()
+        await handlers['subscribe']('laser', 'laser.*')
+        await handlers['subscribe']('channel', ['channels[3]'])
+
+        lab.laser.power = 1.0
+        lab.channels[3].voltage = 2.0
+        lab.channels[1].voltage = 3.0
+        await asyncio.sleep(0.05)
+        assert sorted(sent) == [('all', 'channels.1.voltage'), ('all', 'channels.3.voltage'),
+                                ('all', 'laser.power'), ('channel', 'channels.3.voltage'),
+                                ('laser', 'laser.power')]
+
+        sent.clear()
+        await handlers['unsubscribe']('channel', 'channels.3')
+        await handlers['disconnect']('all')
+        lab.channels[3].voltage = 4.0
+        lab.laser.wavelength = 1064.0
+        await asyncio.sleep(0.05)
+        assert sent == [('laser', 'laser.wavelength')]
+
+        for sid in ('laser', 'channel'):
+            await handlers['disconnect'](sid)
+        assert not lab.__data_model__.events
+
+    asyncio.run(main())
+
+
+def test_session_parent_changes(monkeypatch):
+    lab = Lab()
+    app = web_api(Model(lab))
+    sio = app._sio
+    sent = []
+
+    async def emit(event, data=None, room=None, **kwargs):
+        sent.append((room, data['data']['name']))
+
+    monkeypatch.setattr(sio, 'emit', emit)
+    handlers = sio.handlers['/']
+
+    async def main():
+        app._notifier.start()
+        for sid, prefix in (('channel', 'channels[3]'), ('power', 'laser.power'), ('voltages', 'channels[].voltage')):
+            await handlers['connect'](sid, {})
+            await handlers['subscribe'](sid, prefix)
+        # assigning a new list or object changes the names below it too
+        lab.channels = [Channel() for _ in range(4)]
+        lab.laser = Laser()
+        await asyncio.sleep(0.05)
+        assert sorted(sent) == [('channel', 'channels'), ('power', 'laser'), ('voltages', 'channels')]
+
+    asyncio.run(main())
+
+
+def test_lazy_routes():
+    lab = Lab()
+    client = TestClient(web_api(Model(lab, lazy=True)))
+    # the routes of the laser exist once it is explored, on the first request below it
+    assert client.get('/laser/power').json() == 0.0
+    lab.laser.power = 2.0
+    assert client.get('/laser/power').json() == 2.0
+    assert client.get('/channels/2/voltage').json() == 0.0
+    assert client.get('/laser/nothing').status_code == 404
+    assert client.get('/').status_code == 200 # the frontend
+
+
+def test_lazy_routes_off_loop():
+    model = Model(Lab(), lazy=True)
+    app = web_api(model)
+    routes = app._rest_app.router.routes
+    loop = asyncio.new_event_loop()
+    app._notifier.start(loop)
+    count = len(routes)
+    model['laser']._expand() # e.g. from a driver thread, while the server is not looking
+    assert len(routes) == count
+    thread = threading.Thread(target=loop.run_until_complete, args=(asyncio.sleep(0.05),))
+    thread.start()
+    thread.join()
+    assert len(routes) > count
+    mounts = [isinstance(route, Mount) for route in routes]
+    assert mounts == sorted(mounts) # the frontend is still last
+    loop.close()